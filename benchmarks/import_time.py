@@ -0,0 +1,87 @@
+"""Cold import cost of the package and each store_schemas module, from `python -X importtime`.
+
+Run with: python -m benchmarks.import_time [--runs 5] [--save imports.json] [--compare imports.json]
+
+Every measurement is a fresh interpreter, so nothing is served from sys.modules.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+MODULES = (
+    "conversation_states",
+    "conversation_states.states",
+    "conversation_states.tokens",
+    "conversation_states.store_schemas.task",
+    "conversation_states.store_schemas.schedule",
+    "conversation_states.store_schemas.instruction",
+    "conversation_states.store_schemas.human_profile",
+)
+# Dependencies that should not load on a bare `import conversation_states`
+HEAVY = ("langgraph", "langchain_core", "tiktoken", "croniter", "sqlalchemy")
+
+
+def import_us(module: str) -> int:
+    # Cumulative microseconds of the module's own line in the importtime report
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    for line in reversed(result.stderr.splitlines()):
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise RuntimeError(f"{module} not found in importtime output")
+
+
+def loaded_heavy(module: str) -> List[str]:
+    code = (f"import sys, {module}; "
+            f"print(' '.join(sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY!r}))))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, dict] = {}
+    print(f"{'module':<50}{'median, ms':>12}{'min, ms':>10}  heavy deps loaded")
+    for module in MODULES:
+        runs = [import_us(module) for _ in range(args.runs)]
+        heavy = loaded_heavy(module)
+        results[module] = {"median_us": statistics.median(runs), "min_us": min(runs), "heavy": heavy}
+        print(f"{module:<50}{statistics.median(runs) / 1000:>12.1f}{min(runs) / 1000:>10.1f}  {' '.join(heavy) or '-'}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        print(f"\n{'module':<50}{'before, ms':>12}{'now, ms':>10}{'change':>9}")
+        for module, now in results.items():
+            before = baseline.get(module)
+            if before is None:
+                continue
+            change = now["median_us"] / before["median_us"] - 1
+            flag = " !" if change > args.threshold else ""
+            print(f"{module:<50}{before['median_us'] / 1000:>12.1f}{now['median_us'] / 1000:>10.1f}{change:>+8.0%}{flag}")
+            if flag:
+                regressions.append(module)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Resident size of a message history as langchain objects vs CompactMessageStore.
+
+Run with: python -m benchmarks.message_memory
+"""
+import gc
+import tracemalloc
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from conversation_states.message_store import CompactMessageStore
+
+SIZES = (100, 1000, 10000)
+USERS = ("alice", "bob", "carol", "dave")
+
+
+def make_messages(n: int):
+    messages = []
+    for i in range(n):
+        turn = i % 3
+        if turn == 0:
+            messages.append(HumanMessage(
+                content=f"message number {i} from the group chat, with some ordinary text",
+                name=USERS[i % len(USERS)],
+                id=f"h{i}",
+                additional_kwargs={"telegram": {"chat_id": -100123, "message_id": i}},
+            ))
+        elif turn == 1:
+            messages.append(AIMessage(
+                content="",
+                id=f"a{i}",
+                tool_calls=[{"name": "search", "args": {"query": f"q{i}"}, "id": f"call{i}"}],
+                response_metadata={"model_name": "gpt-4o", "finish_reason": "tool_calls",
+                                   "token_usage": {"prompt_tokens": 900 + i, "completion_tokens": 20}},
+            ))
+        else:
+            messages.append(ToolMessage(content=f"result {i}", tool_call_id=f"call{i - 1}", id=f"t{i}"))
+    return messages
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    holder = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del holder
+    return size
+
+
+def main() -> None:
+    print(f"{'messages':>10}{'list, KiB':>14}{'compact, KiB':>16}{'ratio':>8}")
+    for n in SIZES:
+        as_list = measure(lambda: make_messages(n))
+        compact = measure(lambda: CompactMessageStore(make_messages(n)))
+        print(f"{n:>10}{as_list / 1024:>14.1f}{compact / 1024:>16.1f}{as_list / compact:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Construction cost of ExternalState / InternalState before and after batched validation.
+
+Run with: python -m benchmarks.state_construction
+"""
+import timeit
+from typing import List
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+from pydantic import TypeAdapter, model_validator
+
+from conversation_states import ExternalState, InternalState
+
+SIZES = (10, 100, 1000)
+
+
+class LegacyExternalState(ExternalState):
+    @model_validator(mode="before")
+    @classmethod
+    def resolve_union(cls, values: dict) -> dict:
+        if "messages" in values:
+            values["messages"] = [
+                TypeAdapter(AnyMessage).validate_python(m)
+                for m in values["messages"]
+            ]
+        return values
+
+
+class LegacyInternalState(InternalState):
+    @model_validator(mode="before")
+    @classmethod
+    def resolve_union(cls, values: dict) -> dict:
+        for field in ["reasoning_messages", "external_messages"]:
+            if field in values:
+                values[field] = [
+                    TypeAdapter(AnyMessage).validate_python(m)
+                    for m in values[field]
+                ]
+        return values
+
+
+def make_messages(n: int) -> List[AnyMessage]:
+    messages = []
+    for i in range(n):
+        if i % 3 == 0:
+            messages.append(HumanMessage(content=f"question {i}", name="alice", id=f"h{i}"))
+        elif i % 3 == 1:
+            messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+        else:
+            messages.append(ToolMessage(content=f"result {i}", tool_call_id=f"c{i}", id=f"t{i}"))
+    return messages
+
+
+def external_payload(messages, as_dicts: bool) -> dict:
+    return {
+        "messages": [m.model_dump() for m in messages] if as_dicts else list(messages),
+        "users": [{"username": "alice", "first_name": "Alice"}],
+    }
+
+
+def internal_payload(messages, as_dicts: bool) -> dict:
+    items = [m.model_dump() for m in messages] if as_dicts else list(messages)
+    return {
+        "reasoning_messages": items[-10:],
+        "external_messages": items,
+        "last_external_message": items[-1],
+        "users": [{"username": "alice", "first_name": "Alice"}],
+        "last_sender": {"username": "alice", "first_name": "Alice"},
+    }
+
+
+def best_of(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main() -> None:
+    print(f"{'state':<10}{'input':<10}{'messages':>10}{'before, ms':>14}{'after, ms':>14}{'speedup':>10}")
+    for name, legacy, current, payload in (
+        ("external", LegacyExternalState, ExternalState, external_payload),
+        ("internal", LegacyInternalState, InternalState, internal_payload),
+    ):
+        for as_dicts in (True, False):
+            for n in SIZES:
+                messages = make_messages(n)
+                number = max(1, 2000 // n)
+                before = best_of(lambda: legacy(**payload(messages, as_dicts)), number)
+                after = best_of(lambda: current(**payload(messages, as_dicts)), number)
+                kind = "dicts" if as_dicts else "objects"
+                print(f"{name:<10}{kind:<10}{n:>10}{before * 1e3:>14.3f}{after * 1e3:>14.3f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Latency, throughput and peak memory of the state, message and reducer hot paths.
+
+Run with: python -m benchmarks.suite [--quick] [--save baseline.json] [--compare baseline.json]
+
+Works offline: when the tiktoken encoding cannot be loaded, a byte-level fallback encoder
+is used (recorded in the results, since its token counts differ from cl100k).
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import tiktoken
+from langchain_core.messages import AIMessage, HumanMessage
+
+from conversation_states import ExternalState, Human, InternalState
+from conversation_states import tokens
+from conversation_states.messages import count_tokens
+from conversation_states.serialization import CheckpointWriter, dumps, loads
+from conversation_states.utils.reducers import add_counted_messages, add_user, manage_state
+
+from .synthetic import make_thread
+
+# (messages, users) per case
+CASES = ((10, 1), (100, 5), (1000, 50), (10000, 500))
+QUICK_CASES = ((10, 1), (1000, 50))
+MIN_TIME = 0.2  # seconds of timed calls per operation
+MAX_CALLS = 2000
+
+Setup = Callable[[list, list], Callable[[], object]]
+
+
+def ensure_encoder() -> str:
+    try:
+        tokens.get_encoder()
+        return tokens.get_encoder().name
+    except Exception:
+        fallback = tiktoken.Encoding(
+            name="byte-fallback",
+            pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={"<|endoftext|>": 256},
+        )
+        tokens.get_encoder = lambda model=None, encoding=None: fallback
+        return fallback.name
+
+
+# --- operations: each setup gets (messages, users) and returns the call to time ---
+
+def op_count_tokens(messages, users):
+    count_tokens(messages[-1])  # warm: the per-message cache is what runs in production
+    return lambda: count_tokens(messages[-1])
+
+
+def op_count_cold(messages, users):
+    counter = tokens.get_counter()
+
+    def run():
+        counter.clear()
+        return counter.count_many(messages)
+    return run
+
+
+def _external(messages, users) -> ExternalState:
+    return ExternalState(messages=messages, users=users, summary="short summary")
+
+
+def op_as_pretty(messages, users):
+    api = _external(messages, users).messages_api
+    return lambda: api.as_pretty(sink=None)
+
+
+def op_last(messages, users):
+    api = _external(messages, users).messages_api
+    return lambda: api.last(role="human", count=3)
+
+
+def op_trim(messages, users):
+    api = _external(messages, users).messages_api
+    api.total_tokens
+    return lambda: api.trim(first_tokens=50, last_tokens=250)
+
+
+def op_sender(messages, users):
+    state = _external(messages + [HumanMessage(content="hi", name=users[-1].username)], users)
+    api, by_name = state.messages_api, state.users_by_name()
+    return lambda: api.sender(by_name)
+
+
+def op_resolve_union(messages, users):
+    payload = [m.model_dump() for m in messages]
+    user_payload = [u.model_dump() for u in users]
+    return lambda: ExternalState(messages=payload, users=user_payload)
+
+
+def op_add_user(messages, users):
+    registry = _external(messages, users).users
+    update = [Human(username=users[len(users) // 2].username, first_name="Renamed", information={"mood": "ok"})]
+    return lambda: add_user(registry, update)
+
+
+def op_manage_state(messages, users):
+    reasoning, update = messages[-10:], [AIMessage(content="done")]
+    return lambda: manage_state(reasoning, update)
+
+
+def op_add_messages(messages, users):
+    # Steady state: the channel already holds the previous step's MessageList
+    left = add_counted_messages([], messages)
+    return lambda: add_counted_messages(left, [HumanMessage(content="one more", name=users[0].username)])
+
+
+def op_from_external(messages, users):
+    state = _external(messages + [HumanMessage(content="hi", name=users[0].username)], users)
+    return lambda: InternalState.from_external(state)
+
+
+def op_from_internal(messages, users):
+    internal = InternalState.from_external(
+        _external(messages + [HumanMessage(content="hi", name=users[0].username)], users))
+    reply = AIMessage(content="reply")
+    return lambda: ExternalState.from_internal(internal, reply)
+
+
+def op_checkpoint_full(messages, users):
+    state = _external(messages, users)
+    return lambda: loads(dumps(state))
+
+
+def op_checkpoint_delta(messages, users):
+    state = _external(add_counted_messages([], messages), users)
+    writer = CheckpointWriter(full_every=10 ** 9)
+    writer.dump(state)
+    step = [state]
+
+    def run():
+        prev = step[0]
+        step[0] = ExternalState.model_construct(
+            messages=add_counted_messages(prev.messages, [HumanMessage(content="next", name=users[0].username)]),
+            users=prev.users, summary=prev.summary, last_reasoning=None)
+        return writer.dump(step[0])
+    return run
+
+
+OPERATIONS: Dict[str, Setup] = {
+    "count_tokens": op_count_tokens,
+    "count_many_cold": op_count_cold,
+    "as_pretty": op_as_pretty,
+    "last": op_last,
+    "trim": op_trim,
+    "sender": op_sender,
+    "resolve_union": op_resolve_union,
+    "add_user": op_add_user,
+    "manage_state": op_manage_state,
+    "add_counted_messages": op_add_messages,
+    "from_external": op_from_external,
+    "from_internal": op_from_internal,
+    "checkpoint_full": op_checkpoint_full,
+    "checkpoint_delta": op_checkpoint_delta,
+}
+
+
+# --- measurement ---
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    pos = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[pos]
+
+
+def measure(fn: Callable[[], object], min_time: float) -> Dict[str, float]:
+    fn()  # warm-up
+    timings: List[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < 5 or (time.perf_counter() < deadline and len(timings) < MAX_CALLS):
+        start = time.perf_counter_ns()
+        fn()
+        timings.append((time.perf_counter_ns() - start) / 1000)
+    timings.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "calls": len(timings),
+        "ops_per_sec": 1e6 / (sum(timings) / len(timings)),
+        "p50_us": percentile(timings, 0.5),
+        "p99_us": percentile(timings, 0.99),
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(cases, selected: Optional[List[str]], min_time: float) -> Iterator[Tuple[str, Dict[str, float]]]:
+    for n_messages, n_users in cases:
+        messages, users = make_thread(n_messages, n_users)
+        for name, setup in OPERATIONS.items():
+            if selected and not any(s in name for s in selected):
+                continue
+            yield f"{name}[m={n_messages},u={n_users}]", measure(setup(messages, users), min_time)
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    # Regressions: p50 slower than the baseline by more than `threshold`
+    regressions = []
+    print(f"\n{'operation':<44}{'p50 before':>12}{'p50 now':>12}{'change':>9}")
+    for key, now in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        change = now["p50_us"] / before["p50_us"] - 1
+        flag = " !" if change > threshold else ""
+        print(f"{key:<44}{before['p50_us']:>12.1f}{now['p50_us']:>12.1f}{change:>+8.0%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="two small cases, shorter timing")
+    parser.add_argument("--only", nargs="*", help="run operations whose name contains any of these")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="p50 slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    encoder = ensure_encoder()
+    cases = QUICK_CASES if args.quick else CASES
+    min_time = MIN_TIME / 4 if args.quick else MIN_TIME
+
+    print(f"encoder: {encoder}")
+    print(f"{'operation':<44}{'ops/s':>12}{'p50, us':>12}{'p99, us':>12}{'peak, KiB':>12}")
+    results: Dict[str, dict] = {}
+    for key, stats in run(cases, args.only, min_time):
+        results[key] = stats
+        print(f"{key:<44}{stats['ops_per_sec']:>12.1f}{stats['p50_us']:>12.1f}"
+              f"{stats['p99_us']:>12.1f}{stats['peak_kib']:>12.1f}", flush=True)
+
+    if args.save:
+        meta = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "encoder": encoder,
+        }
+        with open(args.save, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("encoder") != encoder:
+            print(f"note: baseline used encoder {baseline['meta'].get('encoder')}")
+        if compare(results, baseline["results"], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Deterministic synthetic threads for the benchmarks: group chats with tool-heavy AI turns.
+
+Content mixes English, Russian, German, Chinese, Arabic and emoji, so tokenization and
+pretty-printing see realistic multi-byte text.
+"""
+import random
+from typing import List, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+
+from conversation_states import Human
+
+PHRASES = (
+    "can you remind me about the dentist appointment tomorrow at 9?",
+    "напомни, пожалуйста, купить молоко и хлеб по дороге домой",
+    "wie wird das Wetter am Wochenende in Berlin?",
+    "我们明天下午三点在咖啡馆见面好吗？",
+    "هل يمكنك تلخيص آخر رسالة في المجموعة؟",
+    "lol that's exactly what I said 😂🔥",
+    "давайте перенесём созвон на пятницу, у меня экзамен",
+    "search for flights from Lisbon to Tbilisi in October",
+)
+TOOLS = ("search", "calendar_lookup", "create_reminder", "weather")
+
+
+def make_users(n: int) -> List[Human]:
+    return [
+        Human(
+            username=f"user{i}",
+            first_name=f"Name{i}",
+            last_name=f"Surname{i}" if i % 2 else None,
+            information={"timezone": "Europe/Moscow" if i % 3 else "UTC", "lang": "ru" if i % 2 else "en"},
+        )
+        for i in range(n)
+    ]
+
+
+def make_thread(n_messages: int, n_users: int, seed: int = 0) -> Tuple[List[AnyMessage], List[Human]]:
+    # Turns: a human message, then an AI reply that half the time goes through 1-3 tool calls
+    rng = random.Random(seed)
+    users = make_users(n_users)
+    messages: List[AnyMessage] = []
+    i = 0
+    while len(messages) < n_messages:
+        user = users[rng.randrange(n_users)]
+        text = " ".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 3)))
+        messages.append(HumanMessage(content=text, name=user.username, id=f"h{i}"))
+        if rng.random() < 0.5:
+            calls = [
+                {"name": rng.choice(TOOLS), "args": {"query": rng.choice(PHRASES), "limit": 5}, "id": f"call{i}-{k}"}
+                for k in range(rng.randint(1, 3))
+            ]
+            messages.append(AIMessage(
+                content="",
+                id=f"a{i}",
+                tool_calls=calls,
+                response_metadata={"model_name": "gpt-4o", "finish_reason": "tool_calls"},
+            ))
+            for call in calls:
+                messages.append(ToolMessage(
+                    content=f"{call['name']} result: " + rng.choice(PHRASES) * rng.randint(1, 4),
+                    tool_call_id=call["id"],
+                    id=f"t{call['id']}",
+                ))
+        messages.append(AIMessage(content=rng.choice(PHRASES), id=f"r{i}"))
+        i += 1
+    return messages[:n_messages], users
@@ -1,4 +1,40 @@
-from .states import ExternalState, InternalState
-from .humans import Human
-# from .messages import MessageHistory
-from .actions import Action, ActionSender, ActionType, Reaction
+import os
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Public names are imported on first access, so `import conversation_states` stays cheap
+_LAZY = {
+    "ExternalState": ".states",
+    "InternalState": ".states",
+    "Human": ".humans",
+    "Action": ".actions",
+    "ActionSender": ".actions",
+    "ActionType": ".actions",
+    "Reaction": ".actions",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from .states import ExternalState, InternalState
+    from .humans import Human
+    # from .messages import MessageHistory
+    from .actions import Action, ActionSender, ActionType, Reaction
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if os.environ.get("CONVERSATION_STATES_PREWARM"):
+    from .tokens import prewarm
+    prewarm()
@@ -1,6 +1,10 @@
-from typing import Literal, Dict
+import asyncio
+import time
+from typing import TYPE_CHECKING, Literal, Dict, List, Optional, Set
 from pydantic import BaseModel
-from langgraph.types import StreamWriter
+
+if TYPE_CHECKING:
+    from langgraph.types import StreamWriter
 
 ActionType = Literal["image", "gif", "voice", "reaction",
                      "sticker", "system-message", "system-notification"]
@@ -19,13 +23,50 @@ class Action(BaseModel):
 
 
 class ActionSender:
-    writer: StreamWriter
+    """Sends actions to the graph stream, one chunk each or buffered into "actions" batches.
+
+    `with sender:` / `async with sender:` buffer for the duration of the block and flush on exit.
+    With buffered=True and no context manager, call flush()/aflush() at the end of the node:
+    outside an event loop nothing flushes a short batch on its own.
+    """
+
+    writer: "StreamWriter"
 
-    def __init__(self, writer: StreamWriter):
+    def __init__(
+        self,
+        writer: "StreamWriter",
+        buffered: bool = False,
+        max_batch: int = 20,
+        max_delay: float = 0.05
+    ):
         self.writer = writer
+        # Buffered senders collect actions and emit them as one "actions" chunk
+        self.buffered = buffered
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Dict] = []
+        self._reactions: Set[str] = set()
+        self._first_at = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._outer: List[bool] = []  # buffered flags to restore, one per open context
 
     def send_action(self, action: Action):
-        self.writer({"actions": [action.dict()]})
+        payload = action.model_dump()
+        if not self.buffered:
+            self.writer({"actions": [payload]})
+            return
+
+        if action.type == "reaction":
+            if action.value in self._reactions:
+                return  # same reaction already queued
+            self._reactions.add(action.value)
+        if not self._pending:
+            self._first_at = time.monotonic()
+            self._schedule_flush()
+        self._pending.append(payload)
+
+        if len(self._pending) >= self.max_batch or time.monotonic() - self._first_at >= self.max_delay:
+            self.flush()
 
     def send_reaction(self, reaction: Reaction):
         action = Action(
@@ -33,3 +74,42 @@ class ActionSender:
             value=reaction
         )
         self.send_action(action)
+
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+        self._reactions.clear()
+        self.writer({"actions": pending})
+
+    async def aflush(self) -> None:
+        self.flush()
+        await asyncio.sleep(0)  # let astream consumers pick the chunk up
+
+    def _schedule_flush(self) -> None:
+        # Under a running loop (astream) the window closes on its own; sync graphs flush on send/exit
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.max_delay, self.flush)
+
+    def __enter__(self) -> "ActionSender":
+        self._outer.append(self.buffered)
+        self.buffered = True
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+        self.buffered = self._outer.pop()
+
+    async def __aenter__(self) -> "ActionSender":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aflush()
+        self.buffered = self._outer.pop()
@@ -0,0 +1,187 @@
+"""Rehydrating and analysing many serialized thread states across a process pool.
+
+Sources are raw state dicts, JSON (str or bytes) or binary checkpoints from `serialization.dumps`.
+They are read lazily in chunks, and at most `max_in_flight` chunks are ever queued or waiting to
+be yielded, so memory stays bounded however long the input is.
+
+    for state in rehydrate(blobs, kind="external"):
+        ...
+    report = token_report(blobs)
+"""
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+Source = Union[dict, str, bytes]
+_KINDS = ("external", "internal")
+_MESSAGE_FIELDS = {"external": ("messages", "last_reasoning"), "internal": ("reasoning_messages", "external_messages")}
+
+
+class BulkError(ValueError):
+    """A source that could not be turned into a state; `index` is its position in the input."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(f"source #{index}: {message}")
+        self.index = index
+        self.message = message
+
+    def __reduce__(self):
+        return BulkError, (self.index, self.message)
+
+
+def load_state(source: Source, kind: str = "external"):
+    # Binary checkpoints start with their codec byte (0-2), JSON never does
+    from .states import ExternalState, InternalState
+    cls = ExternalState if kind == "external" else InternalState
+    if isinstance(source, (bytes, bytearray, memoryview)) and len(source) and source[0] < 3:
+        from .serialization import loads
+        return loads(bytes(source))
+    if isinstance(source, (str, bytes, bytearray)):
+        return cls.model_validate_json(source)
+    return cls.model_validate(source)
+
+
+def _state_kind(state: Any) -> str:
+    from .states import InternalState
+    return "internal" if isinstance(state, InternalState) else "external"
+
+
+def warm_state(state: Any) -> Any:
+    # Token ledgers are built in the worker and travel back pickled with the state
+    for field in _MESSAGE_FIELDS[_state_kind(state)]:
+        if getattr(state, field):
+            state.token_ledger(field)
+    return state
+
+
+def state_stats(state: Any) -> Dict[str, int]:
+    kind = _state_kind(state)
+    stats = {"states": 1, "users": len(state.users), "summary_chars": len(state.summary)}
+    for field in _MESSAGE_FIELDS[kind]:
+        items = getattr(state, field) or []
+        stats[f"{field}.messages"] = len(items)
+        stats[f"{field}.tokens"] = state.token_ledger(field).total if items else 0
+        stats[f"{field}.tool_calls"] = sum(len(getattr(m, "tool_calls", None) or ()) for m in items)
+    return stats
+
+
+def merge_stats(total: Dict[str, int], stats: Dict[str, int]) -> Dict[str, int]:
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def _run_chunk(fn: Callable[[Any], Any], kind: str, start: int, chunk: List[Source],
+               errors: str) -> Tuple[list, Optional[BulkError]]:
+    # (index, result) pairs plus, with errors="raise", the failure that stopped the chunk;
+    # exceptions are flattened to BulkError since not all of them pickle
+    results = []
+    for index, source in enumerate(chunk, start):
+        try:
+            results.append((index, fn(load_state(source, kind))))
+        except Exception as e:
+            error = BulkError(index, f"{type(e).__name__}: {e}")
+            if errors == "raise":
+                return results, error
+            if errors == "return":
+                results.append((index, error))
+    return results, None
+
+
+def map_states(
+    fn: Callable[[Any], Any],
+    sources: Iterable[Source],
+    kind: str = "external",
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    max_in_flight: Optional[int] = None,
+    ordered: bool = True,
+    errors: str = "raise",
+    executor: Optional[Executor] = None,
+) -> Iterator[Tuple[int, Any]]:
+    """Yields `(index, fn(state))` for every source.
+
+    `fn` runs in the worker processes, so it must be picklable (a module-level function).
+    errors: "raise" stops at the first bad source, "skip" drops bad sources,
+    "return" yields a BulkError in place of the result.
+    workers=1 runs everything inline, which is handy for debugging and small inputs.
+    """
+    if kind not in _KINDS:
+        raise ValueError(f"kind must be one of {_KINDS}")
+    if errors not in ("raise", "skip", "return"):
+        raise ValueError("errors must be 'raise', 'skip' or 'return'")
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    chunks = _chunks(sources, chunk_size)
+
+    if workers == 1 and executor is None:
+        for start, chunk in chunks:
+            yield from _checked(_run_chunk(fn, kind, start, chunk, errors))
+        return
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    pending: deque = deque()
+    try:
+        for start, chunk in chunks:
+            pending.append(pool.submit(_run_chunk, fn, kind, start, chunk, errors))
+            while len(pending) >= max_in_flight:
+                yield from _drain(pending, ordered)
+        while pending:
+            yield from _drain(pending, ordered)
+    finally:
+        for future in pending:
+            future.cancel()
+        if executor is None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _chunks(sources: Iterable[Source], size: int) -> Iterator[Tuple[int, List[Source]]]:
+    it = iter(sources)
+    start = 0
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def _drain(pending: deque, ordered: bool) -> Iterator[Tuple[int, Any]]:
+    # Ordered: wait for the oldest chunk; unordered: take whichever finished first
+    if ordered:
+        future = pending.popleft()
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        future = done.pop()
+        pending.remove(future)
+    yield from _checked(future.result())
+
+
+def _checked(outcome: Tuple[list, Optional[BulkError]]) -> Iterator[Tuple[int, Any]]:
+    results, error = outcome
+    yield from results
+    if error is not None:
+        raise error
+
+
+def rehydrate(sources: Iterable[Source], kind: str = "external", count_tokens: bool = True,
+              **options: Any) -> Iterator[Any]:
+    # Validated ExternalState/InternalState objects; with count_tokens their ledgers come ready-made
+    fn = warm_state if count_tokens else _identity
+    for _, state in map_states(fn, sources, kind, **options):
+        yield state
+
+
+def token_report(sources: Iterable[Source], kind: str = "external", **options: Any) -> Dict[str, int]:
+    # Totals of state_stats over all sources; only small dicts cross process boundaries
+    total: Dict[str, int] = {}
+    for _, stats in map_states(state_stats, sources, kind, **options):
+        if not isinstance(stats, BulkError):
+            merge_stats(total, stats)
+    return total
+
+
+def _identity(state: Any) -> Any:
+    return state
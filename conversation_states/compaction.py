@@ -0,0 +1,125 @@
+"""Keeps a thread's message history bounded by folding its oldest part into `summary`.
+
+Usable directly as a LangGraph node: it returns `{"summary": ..., "messages": [RemoveMessage, ...]}`
+once the history goes over `max_tokens`, and `{}` otherwise.
+"""
+import inspect
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Union
+from langchain_core.messages import BaseMessage, RemoveMessage
+from .messages import MessageAPI
+from .tokens import message_text
+
+# (previous summary, messages being compacted) -> new summary
+Summarizer = Callable[[str, Sequence[BaseMessage]], Union[str, Awaitable[str]]]
+
+
+def _tool_call_ids(msg: BaseMessage) -> List[str]:
+    calls = getattr(msg, "tool_calls", None) or msg.additional_kwargs.get("tool_calls") or []
+    return [call["id"] for call in calls if call.get("id")]
+
+
+def safe_cut(messages: Sequence[BaseMessage], target: int, limit: int) -> int:
+    # Smallest cut >= target (else largest below it) where no tool call is left waiting for its result;
+    # the cut never goes past `limit`
+    pending = set()
+    best = 0
+    for pos in range(limit):
+        if not pending and pos >= target:
+            return pos
+        if not pending:
+            best = pos
+        msg = messages[pos]
+        if msg.type == "tool":
+            pending.discard(getattr(msg, "tool_call_id", None))
+        elif msg.type == "ai":
+            pending.update(_tool_call_ids(msg))
+    return limit if not pending else best
+
+
+def stub_summarizer(previous: str, messages: Sequence[BaseMessage], max_chars: int = 2000) -> str:
+    # Deterministic and local: one short line per message, oldest lines dropped past max_chars
+    lines = [previous] if previous else []
+    for msg in messages:
+        text = " ".join(message_text(msg).split())
+        if not text:
+            continue
+        who = getattr(msg, "name", None) or msg.type
+        lines.append(f"{who}: {text[:80]}")
+    lines = "\n".join(lines).splitlines()
+    size = sum(len(line) + 1 for line in lines) - 1
+    start = 0
+    while size > max_chars and start < len(lines) - 1:
+        size -= len(lines[start]) + 1
+        start += 1
+    return "\n".join(lines[start:])
+
+
+class Compactor:
+    """Drops the oldest messages once the history exceeds `max_tokens`, down to about `keep_tokens`.
+
+    Leading system messages and the last `keep_last` messages are never compacted, and an AI
+    tool call is always kept together with its ToolMessages.
+    """
+
+    def __init__(
+        self,
+        summarizer: Summarizer = stub_summarizer,
+        max_tokens: int = 4000,
+        keep_tokens: int = 2000,
+        keep_last: int = 4,
+        field: str = "messages",
+    ):
+        if keep_tokens > max_tokens:
+            raise ValueError("keep_tokens must not exceed max_tokens")
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.keep_tokens = keep_tokens
+        self.keep_last = keep_last
+        self.field = field
+
+    def select(self, state: Any) -> List[BaseMessage]:
+        # The messages to compact, oldest first; empty while under the threshold
+        api = MessageAPI(state, self.field)
+        ledger = api.ledger
+        if ledger.total <= self.max_tokens:
+            return []
+        items = api.items
+        start = 0
+        while start < len(items) and items[start].type == "system":
+            start += 1
+        limit = max(start, len(items) - self.keep_last)
+        if limit <= start:
+            return []
+        counts = ledger.counts_for(items)
+        prefix = list(accumulate(counts, initial=0))
+        target = bisect_left(prefix, prefix[-1] - self.keep_tokens)
+        cut = safe_cut(items, max(target, start), limit)
+        return [msg for msg in items[start:cut] if msg.id is not None]
+
+    def _update(self, old: Sequence[BaseMessage], summary: str) -> Dict[str, Any]:
+        return {"summary": summary, self.field: [RemoveMessage(id=msg.id) for msg in old]}
+
+    def compact(self, state: Any) -> Dict[str, Any]:
+        old = self.select(state)
+        if not old:
+            return {}
+        summary = self.summarizer(state.summary or "", old)
+        if inspect.isawaitable(summary):
+            if inspect.iscoroutine(summary):
+                summary.close()
+            raise TypeError("async summarizer: use acompact()")
+        return self._update(old, summary)
+
+    async def acompact(self, state: Any) -> Dict[str, Any]:
+        old = self.select(state)
+        if not old:
+            return {}
+        summary = self.summarizer(state.summary or "", old)
+        if inspect.isawaitable(summary):
+            summary = await summary
+        return self._update(old, summary)
+
+    def __call__(self, state: Any) -> Dict[str, Any]:
+        return self.compact(state)
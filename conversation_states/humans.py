@@ -1,5 +1,6 @@
-from typing import Optional, Dict
-from pydantic import BaseModel, Field
+from typing import Any, Dict, Iterable, Optional, Union
+from pydantic import BaseModel, Field, GetCoreSchemaHandler
+from pydantic_core import core_schema
 
 class Human(BaseModel):
     username: str
@@ -20,3 +21,143 @@ class Human(BaseModel):
                     # Remove existing if value is empty
                     del self.information[key]
                 # else: ignore non-existent empty key
+
+    def merged_with(self, update: "Human") -> "Human":
+        # New Human with the update applied; information merges like update_info
+        changes = {
+            field: getattr(update, field)
+            for field in update.model_fields_set - {"username", "information"}
+            if getattr(update, field) is not None
+        }
+        merged = self.model_copy(update=changes)
+        merged.information = dict(self.information)
+        merged.update_info(update.information)
+        return merged
+
+
+class UserRegistry(list):
+    """List of Humans with a username index: O(1) lookups and upserts.
+
+    Still a plain list for iteration, indexing and serialization. upsert/append/extend/+=
+    keep the index current; any other in-place change drops it and the next lookup rebuilds it.
+    """
+
+    __slots__ = ("_positions",)
+
+    def __init__(self, users: Iterable[Union[Human, dict]] = ()):
+        super().__init__()
+        self._positions: Optional[Dict[str, int]] = {}
+        self.upsert_many(users)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_after_validator_function(
+            lambda users: users if isinstance(users, cls) else cls(users),
+            handler.generate_schema(list[Human]),
+        )
+
+    def _index(self) -> Dict[str, int]:
+        if self._positions is None:
+            # First entry wins if a direct edit left duplicate usernames
+            positions: Dict[str, int] = {}
+            for i, user in enumerate(self):
+                positions.setdefault(user.username, i)
+            self._positions = positions
+        return self._positions
+
+    def get(self, username: str, default: Optional[Human] = None) -> Optional[Human]:
+        pos = self._index().get(username)
+        return self[pos] if pos is not None else default
+
+    def __contains__(self, user: object) -> bool:
+        if isinstance(user, str):
+            return user in self._index()
+        return super().__contains__(user)
+
+    def __reduce__(self):
+        # Default list pickling calls extend() before _positions exists
+        return UserRegistry, (list(self),)
+
+    def copy(self) -> "UserRegistry":
+        registry = UserRegistry()
+        super(UserRegistry, registry).extend(self)
+        registry._positions = self._index().copy()
+        return registry
+
+    def upsert(self, user: Union[Human, dict]) -> Human:
+        # Existing entries are replaced by a merged copy, never mutated, so older snapshots stay intact
+        if not isinstance(user, Human):
+            user = Human(**user)
+        positions = self._index()
+        pos = positions.get(user.username)
+        if pos is None:
+            positions[user.username] = len(self)
+            super().append(user)
+            return user
+        current = self[pos]
+        if current is not user:
+            user = current.merged_with(user)
+            super().__setitem__(pos, user)
+        return user
+
+    def replace(self, user: Human) -> None:
+        # Puts the entry as is, without merging into the existing one
+        positions = self._index()
+        pos = positions.get(user.username)
+        if pos is None:
+            positions[user.username] = len(self)
+            super().append(user)
+        else:
+            super().__setitem__(pos, user)
+
+    def upsert_many(self, users: Iterable[Union[Human, dict]]) -> None:
+        for user in users:
+            self.upsert(user)
+
+    def append(self, user: Union[Human, dict]) -> None:
+        self.upsert(user)
+
+    def extend(self, users: Iterable[Union[Human, dict]]) -> None:
+        self.upsert_many(users)
+
+    def __iadd__(self, users: Iterable[Union[Human, dict]]) -> "UserRegistry":
+        self.upsert_many(users)
+        return self
+
+    # Other in-place changes can move or rename entries: drop the index
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._positions = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._positions = None
+
+    def __imul__(self, n):
+        self._positions = None
+        return super().__imul__(n)
+
+    def insert(self, pos, user):
+        super().insert(pos, user)
+        self._positions = None
+
+    def pop(self, pos=-1):
+        self._positions = None
+        return super().pop(pos)
+
+    def remove(self, user):
+        super().remove(user)
+        self._positions = None
+
+    def clear(self):
+        super().clear()
+        self._positions = {}
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._positions = None
+
+    def reverse(self):
+        super().reverse()
+        self._positions = None
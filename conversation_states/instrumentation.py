@@ -0,0 +1,168 @@
+"""Opt-in counters and timers for the package's hot paths.
+
+Zero cost unless installed: wrappers are only put around the hot paths when `enable()` runs
+(or CONVERSATION_STATES_INSTRUMENTATION is set) before the instrumented modules are imported;
+after that, `disable()` / `enable()` toggle recording at the price of one flag check.
+
+Calls are aggregated per thread scope (set with `scope(thread_id)`, carried by contextvars
+across asyncio tasks), and optional hooks receive each timing as it happens. At most
+MAX_SCOPES scopes are kept; `forget(thread_id)` drops one as soon as its thread is done.
+"""
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+INSTALLED = bool(os.environ.get("CONVERSATION_STATES_INSTRUMENTATION"))
+ENABLED = INSTALLED
+_skipped: List[str] = []  # modules whose functions were left unwrapped
+
+# scope, operation name, seconds, payload size (None when not measured)
+Hook = Callable[[Optional[str], str, float, Optional[int]], None]
+
+MAX_SCOPES = 1024  # least recently recorded thread scopes beyond this are dropped
+
+_scope: ContextVar[Optional[str]] = ContextVar("conversation_states_scope", default=None)
+_stats: "OrderedDict[Optional[str], Dict[str, Dict[str, float]]]" = OrderedDict()
+_hooks: List[Hook] = []
+_lock = Lock()
+
+
+def enable() -> None:
+    global ENABLED, INSTALLED
+    if not INSTALLED and _skipped:
+        raise RuntimeError(
+            "conversation_states instrumentation must be enabled before importing its modules "
+            f"({_skipped[0]} is already loaded), or set CONVERSATION_STATES_INSTRUMENTATION=1")
+    INSTALLED = ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def add_hook(hook: Hook) -> None:
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    _hooks.remove(hook)
+
+
+@contextmanager
+def scope(thread_id: Any) -> Iterator[None]:
+    # Everything recorded inside is attributed to this conversation thread
+    token = _scope.set(str(thread_id))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def _entry(name: str) -> Dict[str, float]:
+    key = _scope.get()
+    by_name = _stats.get(key)
+    if by_name is None:
+        by_name = _stats[key] = {}
+        while len(_stats) > MAX_SCOPES:
+            _stats.popitem(last=False)
+    else:
+        _stats.move_to_end(key)
+    entry = by_name.get(name)
+    if entry is None:
+        entry = by_name[name] = {"calls": 0, "time": 0.0, "max": 0.0, "items": 0}
+    return entry
+
+
+def record(name: str, seconds: float, size: Optional[int] = None) -> None:
+    with _lock:
+        entry = _entry(name)
+        entry["calls"] += 1
+        entry["time"] += seconds
+        if seconds > entry["max"]:
+            entry["max"] = seconds
+        if size is not None:
+            entry["items"] += size
+    for hook in _hooks:
+        hook(_scope.get(), name, seconds, size)
+
+
+def count(name: str, **counters: int) -> None:
+    # Plain counters, e.g. count("token_cache", hits=3, misses=1)
+    with _lock:
+        entry = _entry(name)
+        for key, value in counters.items():
+            entry[key] = entry.get(key, 0) + value
+
+
+def instrumented(name: str, size: Optional[Callable[..., int]] = None):
+    # `size` gets the call's arguments and returns its payload size (messages, users, chars)
+    def decorate(fn):
+        if not INSTALLED:
+            _skipped.append(fn.__module__)
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            items = size(*args, **kwargs) if size is not None else None
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start, items)
+        return wrapper
+    return decorate
+
+
+def snapshot(thread_id: Any = None, reset: bool = False) -> Dict[str, Dict[str, Dict[str, float]]]:
+    # {scope: {operation: stats}}; scope "-" holds calls made outside any scope()
+    with _lock:
+        if thread_id is None:
+            selected = dict(_stats)
+        else:
+            selected = {str(thread_id): _stats.get(str(thread_id), {})}
+        result = {
+            "-" if key is None else key: {name: _summary(entry) for name, entry in by_name.items()}
+            for key, by_name in selected.items()
+        }
+        if reset:
+            if thread_id is None:
+                _stats.clear()
+            else:
+                _stats.pop(str(thread_id), None)
+    return result
+
+
+def _summary(entry: Dict[str, float]) -> Dict[str, float]:
+    calls = entry["calls"]
+    if not calls:
+        # counters only, e.g. token_cache
+        summary = {k: v for k, v in entry.items() if k not in ("calls", "time", "max", "items")}
+    else:
+        summary = dict(entry)
+        summary["time_ms"] = summary.pop("time") * 1000
+        summary["max_us"] = summary.pop("max") * 1e6
+        summary["mean_us"] = summary["time_ms"] * 1000 / calls
+        summary["mean_items"] = entry["items"] / calls
+    if "hits" in entry or "misses" in entry:
+        lookups = entry.get("hits", 0) + entry.get("misses", 0)
+        summary["hit_rate"] = entry.get("hits", 0) / lookups if lookups else 0.0
+    return summary
+
+
+def forget(thread_id: Any) -> None:
+    # Drops one thread's stats, e.g. when the conversation ends
+    with _lock:
+        _stats.pop(str(thread_id), None)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
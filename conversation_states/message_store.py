@@ -0,0 +1,213 @@
+import pickle
+import shelve
+import sys
+import zlib
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from langchain_core.messages import BaseMessage, RemoveMessage
+from .messages import MessageAPI, MessageIndex, validate_messages
+from .tokens import REMOVE_ALL_MESSAGES, TokenLedger
+
+_INLINE_FIELDS = {"type", "content", "name", "id"}
+
+
+class _Record:
+    # What nodes filter and count on stays inline; everything else lives in the extras store
+    __slots__ = ("type", "name", "id", "content", "key")
+
+    def __init__(self, type: str, name: Optional[str], id: Optional[str], content: Any, key: int):
+        self.type = type
+        self.name = name
+        self.id = id
+        self.content = content
+        self.key = key
+
+
+class CompactMessageStore(Sequence):
+    """Memory-lean message history that builds langchain messages only when they are read.
+
+    Role and name strings are interned, additional_kwargs / response_metadata / tool calls are
+    pickled and compressed out of line (or spilled to a shelve file), and the last few
+    materialized messages are kept in a small LRU.
+
+    Standalone: ExternalState, the reducers and checkpointers still hold plain message lists,
+    so use it for histories kept outside graph state (archives, offline jobs). A spill_path
+    file is always created empty (an existing one is overwritten); close the store or use it
+    as a context manager.
+    """
+
+    def __init__(
+        self,
+        messages: Iterable[BaseMessage] = (),
+        spill_path: Optional[str] = None,
+        materialized_cache: int = 64,
+    ):
+        self._records: List[_Record] = []
+        self._by_id: Dict[str, _Record] = {}
+        self._extras: Union[Dict[int, bytes], shelve.Shelf] = (
+            shelve.open(spill_path, flag="n") if spill_path else {})
+        self._spilled = spill_path is not None
+        self._next_key = 0
+        self._cache: "OrderedDict[int, BaseMessage]" = OrderedDict()
+        self._cache_size = materialized_cache
+        self._sidecars: Dict[str, Any] = {}
+        self.extend(messages)
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[BaseMessage], **kwargs) -> "CompactMessageStore":
+        return cls(messages, **kwargs)
+
+    # MessageAPI reads the history through this attribute
+    @property
+    def messages(self) -> "CompactMessageStore":
+        return self
+
+    @property
+    def messages_api(self) -> MessageAPI:
+        return MessageAPI(self, "messages")
+
+    # --- writes ---
+
+    def _pack(self, msg: BaseMessage) -> _Record:
+        key = self._next_key
+        self._next_key += 1
+        extra = msg.model_dump(exclude=_INLINE_FIELDS, exclude_defaults=True)
+        if extra:
+            blob = zlib.compress(pickle.dumps(extra, pickle.HIGHEST_PROTOCOL))
+            self._extras[str(key) if self._spilled else key] = blob
+        name = msg.name
+        return _Record(
+            sys.intern(msg.type),
+            sys.intern(name) if name is not None else None,
+            msg.id,
+            msg.content,
+            key,
+        )
+
+    def _drop_extra(self, key: int) -> None:
+        self._extras.pop(str(key) if self._spilled else key, None)
+
+    def append(self, msg: BaseMessage) -> None:
+        self.apply([msg])
+
+    def extend(self, messages: Iterable[BaseMessage]) -> None:
+        self.apply(list(messages))
+
+    def apply(self, messages: List[BaseMessage]) -> None:
+        # add_messages semantics: RemoveMessage drops, a known id replaces, anything else appends
+        if not messages:
+            return
+        records, by_id = self._records, self._by_id
+        removed = set()
+        appended = []
+        shifted = False
+        for msg in validate_messages(messages):
+            if isinstance(msg, RemoveMessage):
+                if msg.id == REMOVE_ALL_MESSAGES:
+                    self.clear()
+                    records, removed, appended = self._records, set(), []
+                    continue
+                record = by_id.pop(msg.id, None)
+                if record is not None:
+                    self._drop_extra(record.key)
+                    removed.add(record.key)
+                    shifted = True
+                continue
+            old = by_id.get(msg.id) if msg.id is not None else None
+            record = self._pack(msg)
+            if old is not None:
+                # Replacements are rare: find the slot, keep the position
+                self._drop_extra(old.key)
+                records[records.index(old)] = record
+                shifted = True
+            else:
+                records.append(record)
+                appended.append(record)
+            if msg.id is not None:
+                by_id[msg.id] = record
+        if removed:
+            self._records = [r for r in records if r.key not in removed]
+        if shifted:
+            self._touch()
+        else:
+            self._extend_sidecars(appended)
+
+    def clear(self) -> None:
+        for record in self._records:
+            self._drop_extra(record.key)
+        self._records = []
+        self._by_id.clear()
+        self._touch()
+
+    def close(self) -> None:
+        if self._spilled:
+            self._extras.close()
+
+    def __enter__(self) -> "CompactMessageStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _touch(self) -> None:
+        self._cache.clear()
+        self._sidecars.clear()
+
+    def _extend_sidecars(self, appended: List[_Record]) -> None:
+        # Pure appends keep every position, so cached messages and sidecars stay valid
+        if "ledger" in self._sidecars:
+            self._sidecars["ledger"].apply(appended)
+        if "index" in self._sidecars:
+            self._sidecars["index"].extend(appended)
+
+    # --- reads ---
+
+    def _materialize(self, pos: int) -> BaseMessage:
+        msg = self._cache.get(pos)
+        if msg is not None:
+            self._cache.move_to_end(pos)
+            return msg
+        record = self._records[pos]
+        data = {"type": record.type, "content": record.content, "name": record.name, "id": record.id}
+        blob = self._extras.get(str(record.key) if self._spilled else record.key)
+        if blob is not None:
+            data.update(pickle.loads(zlib.decompress(blob)))
+        [msg] = validate_messages([data])
+        self._cache[pos] = msg
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return msg
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self._materialize(i) for i in range(*pos.indices(len(self._records)))]
+        if pos < 0:
+            pos += len(self._records)
+        if not 0 <= pos < len(self._records):
+            raise IndexError("message index out of range")
+        return self._materialize(pos)
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        for pos in range(len(self._records)):
+            yield self._materialize(pos)
+
+    def to_messages(self) -> List[BaseMessage]:
+        return list(self)
+
+    # Ledger and index work on the inline records, so they never materialize messages
+
+    def _sidecar(self, kind: str, build):
+        sidecar = self._sidecars.get(kind)
+        if sidecar is None:
+            sidecar = self._sidecars[kind] = build(self._records)
+        return sidecar
+
+    def token_ledger(self, field: str = "messages") -> TokenLedger:
+        return self._sidecar("ledger", TokenLedger.from_messages)
+
+    def message_index(self, field: str = "messages") -> MessageIndex:
+        return self._sidecar("index", MessageIndex.build)
@@ -1,5 +1,7 @@
-from typing import Literal, Optional, List, Union
-from pydantic import BaseModel
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterator, Literal, Optional, List, Sequence, TextIO, Tuple, Union
+from pydantic import BaseModel, TypeAdapter
 from langchain_core.messages import (
     BaseMessage,
     HumanMessage,
@@ -7,24 +9,47 @@ from langchain_core.messages import (
     ToolMessage,
     SystemMessage,
     AnyMessage,
-    trim_messages,
     RemoveMessage
 )
-import tiktoken
 from .humans import Human
+from .instrumentation import instrumented
+from .tokens import TokenLedger, get_counter, message_text
 
 
 CountType = Union[int, Literal["all"], None]
 
 RoleLiteral = Literal["human", "ai", "tool", "system", "unknown"]
 
+# A text stream (anything with .write) or a callable such as print / logger.debug
+Sink = Union[TextIO, Callable[[str], Any]]
 
-def count_tokens(msg) -> int:
-    tokenizer = tiktoken.encoding_for_model("gpt-4")
-    content = getattr(msg, "content", "")
-    if not isinstance(content, str):
-        content = str(content)
-    return len(tokenizer.encode(content))
+_MESSAGES_ADAPTER = TypeAdapter(List[AnyMessage])
+
+
+def _history_size(api: "MessageAPI", *args, **kwargs) -> int:
+    return len(api.items or ())
+
+
+def _emitter(sink: Sink) -> Callable[[str], Any]:
+    write = getattr(sink, "write", None)
+    return write if write is not None else sink
+
+
+def validate_messages(messages: Sequence) -> List[AnyMessage]:
+    # Typed messages pass through; everything else is validated in one batch
+    pending = [i for i, m in enumerate(messages) if not isinstance(m, BaseMessage)]
+    if not pending:
+        return list(messages)
+    validated = _MESSAGES_ADAPTER.validate_python([messages[i] for i in pending])
+    result = list(messages)
+    for i, msg in zip(pending, validated):
+        result[i] = msg
+    return result
+
+
+@instrumented("count_tokens", size=lambda msg, *args, **kwargs: len(message_text(msg)))
+def count_tokens(msg, model: Optional[str] = None, encoding: Optional[str] = None) -> int:
+    return get_counter(model, encoding).count(msg)
 
 
 def get_role(msg: BaseMessage) -> RoleLiteral:
@@ -43,6 +68,129 @@ def get_role(msg: BaseMessage) -> RoleLiteral:
     return "unknown"
 
 
+class MessageIndex:
+    """Role, name and id positions for one message list; append-only, rebuilt on removal."""
+
+    __slots__ = ("by_role", "by_name", "by_id", "size")
+
+    def __init__(self):
+        self.by_role: Dict[str, List[int]] = {}
+        self.by_name: Dict[str, List[int]] = {}
+        self.by_id: Dict[str, int] = {}
+        self.size = 0
+
+    @classmethod
+    def build(cls, messages: Sequence[BaseMessage]) -> "MessageIndex":
+        index = cls()
+        index.extend(messages)
+        return index
+
+    def copy(self) -> "MessageIndex":
+        index = MessageIndex()
+        index.by_role = {k: v.copy() for k, v in self.by_role.items()}
+        index.by_name = {k: v.copy() for k, v in self.by_name.items()}
+        index.by_id = self.by_id.copy()
+        index.size = self.size
+        return index
+
+    def extend(self, messages: Sequence[BaseMessage]) -> None:
+        by_role, by_name, by_id = self.by_role, self.by_name, self.by_id
+        for pos, msg in enumerate(messages, self.size):
+            by_role.setdefault(get_role(msg), []).append(pos)
+            name = getattr(msg, "name", None)
+            if name is not None:
+                by_name.setdefault(name, []).append(pos)
+            msg_id = getattr(msg, "id", None)
+            if msg_id is not None:
+                by_id[msg_id] = pos
+        self.size += len(messages)
+
+    def position(self, msg_id: str) -> Optional[int]:
+        return self.by_id.get(msg_id)
+
+    def last_positions(
+        self,
+        role: Optional[RoleLiteral] = None,
+        name: Optional[str] = None,
+        count: CountType = 1
+    ) -> List[int]:
+        # Same matching as MessageAPI.last: role OR name
+        lists = []
+        if role is not None:
+            lists.append(self.by_role.get(role, []))
+        if name is not None:
+            lists.append(self.by_name.get(name, []))
+        if count != "all":
+            lists = [positions[-count:] for positions in lists]
+        if len(lists) == 1:
+            positions = lists[0]
+        else:
+            positions = sorted(set(lists[0]).union(lists[1]))
+        if count != "all":
+            positions = positions[-count:]
+        return positions
+
+
+def _role_in(msg: BaseMessage, roles: Union[RoleLiteral, Tuple[RoleLiteral, ...], None]) -> bool:
+    if roles is None:
+        return True
+    if isinstance(roles, str):
+        return get_role(msg) == roles
+    return get_role(msg) in roles
+
+
+def trim_window(
+    messages: Sequence[BaseMessage],
+    token_counts: Sequence[int],
+    first_tokens: int,
+    last_tokens: int,
+    first_end_on: Union[RoleLiteral, Tuple[RoleLiteral, ...], None] = ("ai", "tool"),
+    last_start_on: Union[RoleLiteral, Tuple[RoleLiteral, ...], None] = "human",
+    last_end_on: Union[RoleLiteral, Tuple[RoleLiteral, ...], None] = ("human", "tool"),
+    include_system: bool = True,
+    gap_marker: Optional[Union[str, BaseMessage]] = None,
+) -> List[BaseMessage]:
+    # Head and tail windows in one pass over prefix sums; the tail never overlaps the head
+    n = len(messages)
+    if n == 0:
+        return []
+    prefix = [0]
+    prefix.extend(accumulate(token_counts))
+
+    head_end = bisect_right(prefix, first_tokens) - 1
+    while head_end > 0 and not _role_in(messages[head_end - 1], first_end_on):
+        head_end -= 1
+
+    system = None
+    budget = last_tokens
+    if include_system and head_end == 0 and get_role(messages[0]) == "system":
+        system = messages[0]
+        budget -= token_counts[0]
+
+    tail_end = n
+    while tail_end > head_end and not _role_in(messages[tail_end - 1], last_end_on):
+        tail_end -= 1
+    lower = max(head_end, 1 if system is not None else 0)
+    tail_start = tail_end
+    if budget >= 0 and tail_end > lower:
+        tail_start = max(bisect_left(prefix, prefix[tail_end] - budget, lower, tail_end), lower)
+        while tail_start < tail_end and not _role_in(messages[tail_start], last_start_on):
+            tail_start += 1
+    if budget < 0:
+        system = None
+
+    window = list(messages[:head_end])
+    if system is not None:
+        window.append(system)
+    omitted = tail_start > lower if tail_start < tail_end else lower < n
+    if gap_marker is not None and omitted:
+        if isinstance(gap_marker, str):
+            gap_marker = SystemMessage(content=gap_marker)
+        window.append(gap_marker)
+    window.extend(messages[tail_start:tail_end])
+    return window
+
+
 class MessageAPI:
     def __init__(self, state: BaseModel, field_name: str):
         self._state = state
@@ -52,11 +200,46 @@ class MessageAPI:
     def items(self) -> List[AnyMessage]:
         return getattr(self._state, self._field_name)
 
-    def as_pretty(self, technical: bool = False, truncate: Optional[int] = None) -> str:
-        total_tokens = 0
-        lines = []
+    @property
+    def ledger(self) -> TokenLedger:
+        token_ledger = getattr(self._state, "token_ledger", None)
+        if token_ledger is not None:
+            return token_ledger(self._field_name)
+        return TokenLedger.from_messages(self.items or [])
+
+    @property
+    def total_tokens(self) -> int:
+        return self.ledger.total
+
+    @property
+    def index(self) -> Optional[MessageIndex]:
+        message_index = getattr(self._state, "message_index", None)
+        if message_index is None:
+            return None
+        return message_index(self._field_name)
+
+    @instrumented("MessageAPI.get", size=_history_size)
+    def get(self, msg_id: str) -> Optional[BaseMessage]:
+        index = self.index
+        if index is not None:
+            pos = index.position(msg_id)
+            return self.items[pos] if pos is not None else None
+        for msg in reversed(self.items):
+            if getattr(msg, "id", None) == msg_id:
+                return msg
+        return None
+
+    def iter_pretty(self, technical: bool = False, truncate: Optional[int] = None) -> Iterator[str]:
+        # Header first, then one line per message/tool call; tokens are only counted when technical
+        items = self.items or []
+        ledger = self.ledger if technical else None
+
+        header = f"Messages: {len(items)}"
+        if ledger is not None:
+            header += f", {ledger.total} tokens"
+        yield header + "\n"
 
-        for msg in self.items:
+        for msg in items:
             role = msg.type
             name = getattr(msg, "name", None)
             at_name = f"@{name}" if name else ""
@@ -74,32 +257,49 @@ class MessageAPI:
                 content = content[:truncate] + \
                     "..." if len(content) > truncate else content
 
-            tokens = count_tokens(msg)
-            total_tokens += tokens
-
             if role == "ai" and "tool_calls" in msg.additional_kwargs:
                 for call in msg.additional_kwargs["tool_calls"]:
                     func = call.get("function", {})
                     tool_name = func.get("name", "unknown")
                     args = func.get("arguments", "{}")
-                    lines.append(
-                        f"🤖 Assistant called tool: `{tool_name}` with `{args}`")
+                    yield f"🤖 Assistant called tool: `{tool_name}` with `{args}`"
                 if not content:
                     continue
 
-            if technical:
+            if ledger is not None:
+                tokens = ledger.get(msg.id) if msg.id is not None else None
+                if tokens is None:
+                    tokens = count_tokens(msg)
                 prefix += f" ({tokens} tokens)"
-            line = f"{prefix}: <blockquote>{content}</blockquote>\n"
-            lines.append(line)
+            yield f"{prefix}: <blockquote>{content}</blockquote>\n"
 
-        header = f"Messages: {len(self.items)}"
-        if technical:
-            header += f", {total_tokens} tokens"
-        header += "\n"
-        print(header + "\n" + "\n".join(lines))
+    @instrumented("MessageAPI.write_pretty", size=_history_size)
+    def write_pretty(self, sink: Sink, technical: bool = False, truncate: Optional[int] = None) -> None:
+        lines = self.iter_pretty(technical=technical, truncate=truncate)
+        write = getattr(sink, "write", None)
+        if write is not None:
+            # Same text as print(as_pretty(...)), written line by line
+            for line in lines:
+                write(line)
+                write("\n")
+        else:
+            for line in lines:
+                sink(line.rstrip("\n"))
 
-        return header + "\n" + "\n".join(lines)
+    @instrumented("MessageAPI.as_pretty", size=_history_size)
+    def as_pretty(
+        self,
+        technical: bool = False,
+        truncate: Optional[int] = None,
+        sink: Optional[Sink] = print
+    ) -> str:
+        header, *lines = self.iter_pretty(technical=technical, truncate=truncate)
+        text = header + "\n" + "\n".join(lines)
+        if sink is not None:
+            _emitter(sink)(text)
+        return text
 
+    @instrumented("MessageAPI.last", size=_history_size)
     def last(
         self,
         role: Optional[RoleLiteral] = None,
@@ -119,6 +319,12 @@ class MessageAPI:
                 return list(self.items)
             return self.items[-count:]
 
+        # С индексом: только позиции нужной роли/имени
+        index = self.index
+        if index is not None:
+            items = self.items
+            return [items[pos] for pos in index.last_positions(role, name, count)]
+
         # С фильтром: собираем подходящие
         filtered = []
         for msg in reversed(self.items):
@@ -131,33 +337,34 @@ class MessageAPI:
 
         return list(reversed(filtered))
 
+    @instrumented("MessageAPI.remove_last", size=_history_size)
     def remove_last(self):
         for msg in reversed(self.items):
             if hasattr(msg, "id") and msg.id:
                 self.items.append(RemoveMessage(id=msg.id))
                 return
 
-    def trim(self, first_tokens: int = 50, last_tokens: int = 250) -> List[BaseMessage]:
-        trimmed_first = trim_messages(
-            self.items,
-            max_tokens=first_tokens,
-            strategy="first",
-            token_counter=count_tokens,
-            end_on=("ai", "tool"),
-            allow_partial=True
-        )
-        trimmed_last = trim_messages(
-            self.items,
-            max_tokens=last_tokens,
-            strategy="last",
-            token_counter=count_tokens,
-            start_on="human",
-            end_on=("human", "tool"),
+    @instrumented("MessageAPI.trim", size=_history_size)
+    def trim(
+        self,
+        first_tokens: int = 50,
+        last_tokens: int = 250,
+        gap_marker: Optional[Union[str, BaseMessage]] = None
+    ) -> List[BaseMessage]:
+        items = self.items or []
+        return trim_window(
+            items,
+            self.ledger.counts_for(items),
+            first_tokens=first_tokens,
+            last_tokens=last_tokens,
+            first_end_on=("ai", "tool"),
+            last_start_on="human",
+            last_end_on=("human", "tool"),
             include_system=True,
-            allow_partial=True
+            gap_marker=gap_marker
         )
-        return trimmed_first + trimmed_last
 
+    @instrumented("MessageAPI.sender", size=_history_size)
     def sender(self, users) -> Optional[Human]:
         [last_human] = self.last(role="human")
         if not last_human or not hasattr(last_human, "name"):
@@ -165,6 +372,9 @@ class MessageAPI:
         username = getattr(last_human, "name", None)
         if not username:
             return None
+        lookup = getattr(users, "get", None)
+        if lookup is not None:
+            return lookup(username)
         for user in users:
             if user.username == username:
                 return user
@@ -0,0 +1,361 @@
+import hashlib
+import operator
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Type
+import ormsgpack
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+from pydantic_core import to_json
+from .humans import Human, UserRegistry
+from .messages import validate_messages
+from .states import (
+    ExternalState, InternalState, MessageCacheState, _extend_index, _extend_ledger, _is_current,
+    track_message_fields,
+)
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is always there
+    zstandard = None
+
+FORMAT_VERSION = 1
+COMPRESS_MIN_SIZE = 256  # smaller payloads (typical deltas) are stored as is
+_NONE, _ZLIB, _ZSTD = 0, 1, 2
+_INLINE_FIELDS = {"type", "content", "name", "id"}
+_DEFAULTS: Dict[type, Dict[str, Any]] = {}  # message class -> field defaults
+
+# kind -> (state class, field -> encoding)
+_SCHEMAS: Dict[str, Tuple[Type[MessageCacheState], Dict[str, str]]] = {
+    "external": (ExternalState, {
+        "messages": "messages",
+        "users": "users",
+        "summary": "value",
+        "last_reasoning": "messages",
+    }),
+    "internal": (InternalState, {
+        "reasoning_messages": "messages",
+        "external_messages": "messages",
+        "last_external_message": "message",
+        "users": "users",
+        "last_sender": "human",
+        "summary": "value",
+    }),
+}
+
+_EXTEND = {"ledger": _extend_ledger, "index": _extend_index}
+
+
+def _kind(state: MessageCacheState) -> str:
+    if isinstance(state, ExternalState):
+        return "external"
+    if isinstance(state, InternalState):
+        return "internal"
+    raise TypeError(f"Cannot serialize {type(state).__name__}")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _pack(payload: dict, compression: Optional[str]) -> bytes:
+    raw = ormsgpack.packb(payload, default=_default)
+    if compression is None or len(raw) < COMPRESS_MIN_SIZE:
+        return bytes([_NONE]) + raw
+    if compression == "zlib":
+        return bytes([_ZLIB]) + zlib.compress(raw)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package")
+        return bytes([_ZSTD]) + zstandard.ZstdCompressor().compress(raw)
+    raise ValueError(f"Unknown compression {compression!r}")
+
+
+def _unpack(data: bytes) -> dict:
+    codec, body = data[0], memoryview(data)[1:]
+    if codec == _ZLIB:
+        body = zlib.decompress(body)
+    elif codec == _ZSTD:
+        if zstandard is None:
+            raise ImportError("zstd compressed checkpoint needs the zstandard package")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif codec != _NONE:
+        raise ValueError(f"Unknown checkpoint codec {codec}")
+    payload = ormsgpack.unpackb(body)
+    if payload.get("v") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {payload.get('v')}")
+    return payload
+
+
+class _Strings:
+    # Role and name strings are written once per payload and referenced by position
+    __slots__ = ("table", "refs")
+
+    def __init__(self):
+        self.table: List[str] = []
+        self.refs: Dict[str, int] = {}
+
+    def ref(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        pos = self.refs.get(value)
+        if pos is None:
+            pos = self.refs[value] = len(self.table)
+            self.table.append(value)
+        return pos
+
+
+def _defaults(cls: Type[BaseMessage]) -> Dict[str, Any]:
+    defaults = _DEFAULTS.get(cls)
+    if defaults is None:
+        defaults = _DEFAULTS[cls] = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in cls.model_fields.items() if not field.is_required()}
+    return defaults
+
+
+def _is_default(value: Any, default: Any) -> bool:
+    # Same type and equal, so 0 / False / "" are kept when the default is None
+    return value is default or (default is not None and type(value) is type(default) and value == default)
+
+
+def _encode_message(msg: BaseMessage, strings: _Strings) -> list:
+    # Fields equal to their default are left out, everything else (extra kwargs too) round-trips
+    defaults = _defaults(type(msg))
+    extra = {k: v for k, v in msg.__dict__.items()
+             if k not in _INLINE_FIELDS and (k not in defaults or not _is_default(v, defaults[k]))}
+    if msg.__pydantic_extra__:
+        extra.update(msg.__pydantic_extra__)
+    return [strings.ref(msg.type), strings.ref(msg.name), msg.id, msg.content, extra or None]
+
+
+def _decode_messages(records: List[list], table: List[str]) -> List[BaseMessage]:
+    data = []
+    for type_ref, name_ref, msg_id, content, extra in records:
+        item = {"type": table[type_ref], "content": content, "id": msg_id}
+        if name_ref >= 0:
+            item["name"] = table[name_ref]
+        if extra:
+            item.update(extra)
+        data.append(item)
+    return validate_messages(data)
+
+
+def _encode(value: Any, encoding: str, strings: _Strings) -> Any:
+    if value is None or encoding == "value":
+        return value
+    if encoding == "messages":
+        return [_encode_message(m, strings) for m in value]
+    if encoding == "message":
+        return _encode_message(value, strings)
+    if encoding == "users":
+        return [u.model_dump(exclude_defaults=True) for u in value]
+    return value.model_dump(exclude_defaults=True)  # human
+
+
+def _decode(value: Any, encoding: str, table: List[str]) -> Any:
+    if value is None or encoding == "value":
+        return value
+    if encoding == "messages":
+        return _decode_messages(value, table)
+    if encoding == "message":
+        return _decode_messages([value], table)[0]
+    if encoding == "users":
+        return UserRegistry(Human(**u) for u in value)
+    return Human(**value)
+
+
+def dumps(state: MessageCacheState, compression: Optional[str] = "zlib") -> bytes:
+    # Full snapshot of an ExternalState / InternalState
+    return _pack(_full_payload(state, None), compression)
+
+
+def loads(data: bytes) -> MessageCacheState:
+    payload = _unpack(data)
+    if payload["base"] is not None:
+        raise ValueError("Delta checkpoint needs its base, use CheckpointReader")
+    return _load_full(payload)
+
+
+def _full_payload(state: MessageCacheState, seq: Optional[int]) -> dict:
+    kind = _kind(state)
+    strings = _Strings()
+    fields = {
+        field: _encode(getattr(state, field), encoding, strings)
+        for field, encoding in _SCHEMAS[kind][1].items()
+    }
+    return {"v": FORMAT_VERSION, "kind": kind, "seq": seq, "base": None,
+            "strings": strings.table, "fields": fields}
+
+
+def _load_full(payload: dict) -> MessageCacheState:
+    cls, schema = _SCHEMAS[payload["kind"]]
+    table = [sys.intern(s) for s in payload["strings"]]
+    values = {
+        field: _decode(value, schema[field], table)
+        for field, value in payload["fields"].items()
+    }
+    # Everything was validated on the way in
+    return track_message_fields(cls.model_construct(**values))
+
+
+def _content(model: BaseModel) -> bytes:
+    return hashlib.blake2b(to_json(model), digest_size=8).digest()
+
+
+def _snapshot(value: Any, encoding: str) -> Any:
+    # Message lists are append-only and kept as shallow copies; users and single models can be
+    # edited in place (Human.update_info), so they are remembered by content hash
+    if value is None:
+        return None
+    if encoding == "messages":
+        return list(value)
+    if encoding == "users":
+        return {u.username: _content(u) for u in value}
+    if encoding in ("message", "human"):
+        return _content(value)
+    return value
+
+
+def _message_delta(old: List[BaseMessage], new: List[BaseMessage], strings: _Strings) -> Optional[dict]:
+    if len(new) >= len(old) and all(map(operator.is_, old, new)):
+        if len(new) == len(old):
+            return None
+        return {"append": [_encode_message(m, strings) for m in new[len(old):]]}
+    # Kept messages in order, everything else in old is removed and the rest of new appended
+    removed = []
+    j = 0
+    for i, msg in enumerate(old):
+        if j < len(new) and new[j] is msg:
+            j += 1
+        else:
+            removed.append(i)
+    return {"remove": removed, "append": [_encode_message(m, strings) for m in new[j:]]}
+
+
+def _users_delta(old: Dict[str, bytes], new: List[Human]) -> Optional[dict]:
+    put = [u.model_dump(exclude_defaults=True) for u in new if old.get(u.username) != _content(u)]
+    names = {u.username for u in new}
+    remove = [name for name in old if name not in names]
+    if not put and not remove:
+        return None
+    return {"put": put, "remove": remove}
+
+
+class CheckpointWriter:
+    """Writes a full snapshot first, then only what changed since the previous dump.
+
+    Appending one message costs one message, whatever the thread length; a full snapshot
+    is written every `full_every` dumps and whenever the state class changes.
+    """
+
+    def __init__(self, compression: Optional[str] = "zlib", full_every: int = 100):
+        self.compression = compression
+        self.full_every = full_every
+        self._seq = 0
+        self._since_full = 0
+        self._kind: Optional[str] = None
+        self._prev: Dict[str, Any] = {}
+
+    def reset(self) -> None:
+        self._kind = None
+        self._prev = {}
+
+    def dump(self, state: MessageCacheState, full: bool = False) -> bytes:
+        kind = _kind(state)
+        seq = self._seq + 1
+        schema = _SCHEMAS[kind][1]
+        if full or kind != self._kind or self._since_full >= self.full_every:
+            payload = _full_payload(state, seq)
+            self._since_full = 0
+        else:
+            payload = self._delta_payload(state, seq, schema)
+            self._since_full += 1
+        self._seq, self._kind = seq, kind
+        self._prev = {field: _snapshot(getattr(state, field), enc) for field, enc in schema.items()}
+        return _pack(payload, self.compression)
+
+    def _delta_payload(self, state: MessageCacheState, seq: int, schema: Dict[str, str]) -> dict:
+        strings = _Strings()
+        delta = {}
+        for field, encoding in schema.items():
+            old, new = self._prev[field], getattr(state, field)
+            if old is None or new is None:
+                if old is not new:
+                    delta[field] = {"set": _encode(new, encoding, strings)}
+                continue
+            if encoding == "messages":
+                change = _message_delta(old, new, strings)
+            elif encoding == "users":
+                change = _users_delta(old, new)
+            elif encoding in ("message", "human"):
+                change = None if old == _content(new) else {"set": _encode(new, encoding, strings)}
+            elif old is new or old == new:
+                change = None
+            else:
+                change = {"set": _encode(new, encoding, strings)}
+            if change is not None:
+                delta[field] = change
+        return {"v": FORMAT_VERSION, "kind": self._kind, "seq": seq, "base": self._seq,
+                "strings": strings.table, "delta": delta}
+
+
+class CheckpointReader:
+    """Rebuilds states from a CheckpointWriter stream; deltas touch only what changed."""
+
+    def __init__(self):
+        self.state: Optional[MessageCacheState] = None
+        self._seq: Optional[int] = None
+
+    def load(self, data: bytes) -> MessageCacheState:
+        payload = _unpack(data)
+        if payload["base"] is None:
+            state = _load_full(payload)
+        elif self.state is None or payload["base"] != self._seq:
+            raise ValueError(
+                f"Delta checkpoint {payload['seq']} expects base {payload['base']}, have {self._seq}")
+        else:
+            state = _apply_delta(self.state, payload)
+        self.state, self._seq = state, payload["seq"]
+        return state
+
+
+def _apply_delta(prev: MessageCacheState, payload: dict) -> MessageCacheState:
+    cls, schema = _SCHEMAS[payload["kind"]]
+    table = [sys.intern(s) for s in payload["strings"]]
+    values = {field: getattr(prev, field) for field in schema}
+    appended: Dict[str, List[BaseMessage]] = {}
+    for field, change in payload["delta"].items():
+        encoding = schema[field]
+        if "set" in change:
+            values[field] = _decode(change["set"], encoding, table)
+        elif encoding == "messages":
+            old = values[field]
+            added = _decode_messages(change["append"], table)
+            if change.get("remove"):
+                gone = set(change["remove"])
+                old = [m for i, m in enumerate(old) if i not in gone]
+            else:
+                appended[field] = added
+            values[field] = old + added
+        else:  # users
+            users = values[field].copy()
+            if change["remove"]:
+                gone = set(change["remove"])
+                users = UserRegistry(u for u in users if u.username not in gone)
+            for user in change["put"]:
+                users.replace(Human(**user))
+            values[field] = users
+
+    state = track_message_fields(cls.model_construct(**values))
+    # Ledgers and indexes of fields that only grew are extended, not rebuilt
+    for (kind, field), entry in prev._message_caches.items():
+        if field in appended and kind in _EXTEND and _is_current(entry, getattr(prev, field)):
+            new_items = getattr(state, field)
+            state._message_caches[(kind, field)] = (
+                new_items, len(new_items), new_items.mutations, _EXTEND[kind](entry[3], appended[field]))
+    return state
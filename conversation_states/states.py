@@ -1,21 +1,140 @@
 from __future__ import annotations
-from typing import List, Optional, Annotated
-from pydantic import BaseModel, Field, model_validator
-from pydantic.type_adapter import TypeAdapter
+from typing import Any, ClassVar, Iterator, List, Optional, Union, Annotated
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 from langchain_core.messages import BaseMessage, RemoveMessage, AnyMessage, AIMessage
-from langgraph.graph import add_messages
-from .humans import Human
-from .messages import MessageAPI, count_tokens
-from .utils.reducers import add_user, manage_state
+from .humans import Human, UserRegistry
+from .instrumentation import instrumented
+from .messages import MessageAPI, MessageIndex, Sink, count_tokens, validate_messages
+from .tokens import MessageList, TokenLedger
+from .utils.reducers import add_counted_messages, add_user, manage_state
 
 
-class InternalState(BaseModel):
-    reasoning_messages: Annotated[List[AnyMessage], add_messages] = Field(
+class MessageCacheState(BaseModel):
+    # Message fields are kept as MessageLists so in-place edits are seen by the caches
+    MESSAGE_FIELDS: ClassVar[tuple[str, ...]] = ()
+    # (kind, field) -> (list the cache was built for, its length and mutation count then, cache)
+    _message_caches: dict[tuple[str, str], tuple[list, int, int, Any]] = PrivateAttr(
+        default_factory=dict)
+
+    def _message_cache(self, kind: str, field: str, build, extend):
+        items = getattr(self, field) or []
+        mutations = getattr(items, "mutations", None)
+        if mutations is None:
+            # Plain list: edits in place cannot be detected, so nothing is cached for it
+            return build(items)
+        entry = self._message_caches.get((kind, field))
+        if entry is not None and entry[0] is items and entry[2] == mutations:
+            _, size, _, cache = entry
+            if size == len(items):
+                return cache
+            # Only appended to (e.g. remove_last): caches may be shared, so extend a copy
+            cache = extend(cache, items[size:])
+        else:
+            cache = build(items)
+        self._message_caches[(kind, field)] = (items, len(items), mutations, cache)
+        return cache
+
+    def token_ledger(self, field: str) -> TokenLedger:
+        return self._message_cache("ledger", field, TokenLedger.from_messages, _extend_ledger)
+
+    def message_index(self, field: str) -> MessageIndex:
+        return self._message_cache("index", field, MessageIndex.build, _extend_index)
+
+    def users_by_name(self) -> Union[UserRegistry, dict[str, Human]]:
+        if isinstance(self.users, UserRegistry):
+            return self.users
+        return self._message_cache("users", "users", _user_map, _extend_user_map)
+
+    def share_message_caches(self, source: "MessageCacheState", source_field: str, field: str) -> None:
+        # Caches that are current for the source list also hold for a same-content copy of it
+        source_items = getattr(source, source_field)
+        items = getattr(self, field)
+        mutations = getattr(items, "mutations", None)
+        if mutations is None or source_items is None or len(items) != len(source_items):
+            return
+        for (kind, cached_field), entry in source._message_caches.items():
+            if cached_field == source_field and _is_current(entry, source_items):
+                self._message_caches[(kind, field)] = (items, len(items), mutations, entry[3])
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def carry_message_caches(cls, values, handler):
+        # Reducers hand over MessageLists; reuse their ledger and index instead of rebuilding
+        carried = []
+        if isinstance(values, dict):
+            for field, value in values.items():
+                if isinstance(value, MessageList):
+                    for kind, cache in value.current_caches().items():
+                        carried.append((kind, field, len(value), cache))
+        state = handler(values)
+        track_message_fields(state)
+        for kind, field, size, cache in carried:
+            items = getattr(state, field, None)
+            if isinstance(items, MessageList) and len(items) == size:
+                state._message_caches[(kind, field)] = (items, size, items.mutations, cache)
+        return state
+
+
+def _is_current(entry: tuple, items: Any) -> bool:
+    return entry[0] is items and entry[1] == len(items) and entry[2] == getattr(items, "mutations", None)
+
+
+def track_message_fields(state: MessageCacheState) -> MessageCacheState:
+    # Swaps plain lists in the message fields for MessageLists (for states built with model_construct)
+    for field in state.MESSAGE_FIELDS:
+        items = state.__dict__.get(field)
+        if type(items) is list:
+            state.__dict__[field] = MessageList(items)
+    return state
+
+
+def _extend_ledger(ledger: TokenLedger, new_items: list) -> TokenLedger:
+    ledger = ledger.copy()
+    ledger.apply(new_items)
+    return ledger
+
+
+def _extend_index(index: MessageIndex, new_items: list) -> MessageIndex:
+    index = index.copy()
+    index.extend(new_items)
+    return index
+
+
+def _user_map(users: list[Human]) -> dict[str, Human]:
+    # First entry wins, like the linear scan it replaces
+    by_name = {}
+    for user in users:
+        by_name.setdefault(user.username, user)
+    return by_name
+
+
+def _extend_user_map(by_name: dict[str, Human], new_users: list[Human]) -> dict[str, Human]:
+    by_name = by_name.copy()
+    for user in new_users:
+        by_name.setdefault(user.username, user)
+    return by_name
+
+
+def _copy_users(users: Any) -> UserRegistry:
+    # Copy keeps the username index; Human entries are shared, upserts replace them rather than edit
+    return users.copy() if isinstance(users, UserRegistry) else UserRegistry(users)
+
+
+def _batch_size(values: Any, fields: tuple) -> int:
+    if not isinstance(values, dict):
+        return 0
+    return sum(len(values.get(field) or ()) for field in fields)
+
+
+class InternalState(MessageCacheState):
+    MESSAGE_FIELDS: ClassVar[tuple[str, ...]] = ("reasoning_messages", "external_messages")
+
+    reasoning_messages: Annotated[List[AnyMessage], add_counted_messages] = Field(
         default_factory=list)
     external_messages: List[AnyMessage] = Field(
         default_factory=list)
     last_external_message: AnyMessage
-    users: Annotated[list[Human], add_user] = Field(default_factory=list)
+    users: Annotated[UserRegistry, add_user] = Field(default_factory=UserRegistry)
     last_sender: Human
     summary: str = ""
 
@@ -28,36 +147,51 @@ class InternalState(BaseModel):
         return MessageAPI(self, "external_messages")
 
     @classmethod
+    @instrumented("InternalState.from_external", size=lambda cls, external: len(external.messages))
     def from_external(cls, external: "ExternalState") -> "InternalState":
         [last_message] = external.messages_api.last()
-        sender = external.messages_api.sender(external.users)
+        sender = external.messages_api.sender(external.users_by_name())
+        if sender is None:
+            # Let validation report the missing sender as before
+            return cls(
+                reasoning_messages=[],
+                summary=external.summary,
+                users=list(external.users),
+                external_messages=external.messages,
+                last_external_message=last_message,
+                last_sender=sender
+            )
 
-        return cls(
-            reasoning_messages=[],
+        # Everything here is already validated: shallow copies, no revalidation
+        internal = cls.model_construct(
+            reasoning_messages=MessageList(),
             summary=external.summary,
-            users=list(external.users),
-            external_messages=external.messages,
+            users=_copy_users(external.users),
+            external_messages=MessageList(external.messages),
             last_external_message=last_message,
             last_sender=sender
         )
+        internal.share_message_caches(external, "messages", "external_messages")
+        return internal
 
     @model_validator(mode="before")
     @classmethod
+    @instrumented("InternalState.resolve_union", size=lambda cls, values: _batch_size(
+        values, ("reasoning_messages", "external_messages")))
     def resolve_union(cls, values: dict) -> dict:
         for field in ["reasoning_messages", "external_messages"]:
             if field in values:
-                values[field] = [
-                    TypeAdapter(AnyMessage).validate_python(m)
-                    for m in values[field]
-                ]
+                values[field] = validate_messages(values[field])
         return values
 
 
-class ExternalState(BaseModel):
-    messages: Annotated[List[AnyMessage], add_messages] = Field(
-        default_factory=list)
-    users: Annotated[list[Human], add_user] = Field(
+class ExternalState(MessageCacheState):
+    MESSAGE_FIELDS: ClassVar[tuple[str, ...]] = ("messages", "last_reasoning")
+
+    messages: Annotated[List[AnyMessage], add_counted_messages] = Field(
         default_factory=list)
+    users: Annotated[UserRegistry, add_user] = Field(
+        default_factory=UserRegistry)
     summary: str = ""
     last_reasoning: Annotated[Optional[list[AnyMessage]],
                               manage_state] = Field(default=None)
@@ -71,35 +205,55 @@ class ExternalState(BaseModel):
         return MessageAPI(self, "messages")
 
     @classmethod
+    @instrumented("ExternalState.from_internal", size=lambda cls, internal, *args: len(internal.reasoning_messages))
     def from_internal(cls, internal: "InternalState", assistant_message: "AIMessage") -> "ExternalState":
-        return cls(
-            messages=[assistant_message],
-            users=list(internal.users),
+        external = cls.model_construct(
+            messages=MessageList(validate_messages([assistant_message])),
+            users=_copy_users(internal.users),
             summary=internal.summary,
-            last_reasoning=internal.reasoning_messages
+            last_reasoning=MessageList(internal.reasoning_messages)
         )
+        external.share_message_caches(internal, "reasoning_messages", "last_reasoning")
+        return external
 
     @model_validator(mode="before")
     @classmethod
+    @instrumented("ExternalState.resolve_union", size=lambda cls, values: _batch_size(values, ("messages",)))
     def resolve_union(cls, values: dict) -> dict:
         if "messages" in values:
-            values["messages"] = [
-                TypeAdapter(AnyMessage).validate_python(m)
-                for m in values["messages"]
-            ]
+            values["messages"] = validate_messages(values["messages"])
         return values
 
     def clear_state(self):
         removed = [RemoveMessage(id=m.id)
                    for m in self.messages if hasattr(m, "id") and m.id]
-        self.messages = removed
+        self.messages = MessageList(removed)
         self.summary = ""
-        self.users = []
-        self.last_reasoning = []
+        self.users = UserRegistry()
+        self.last_reasoning = MessageList()
         return
 
-    def summarize_overall_state(self) -> str:
+    def iter_overall_state(self, technical: bool = False) -> Iterator[str]:
+        # Same blocks as summarize_overall_state, yielded lazily
+        yield self._users_block()
+        yield ""
+        yield from self.messages_api.iter_pretty(technical=technical)
+        yield ""
+        yield self._summary_block()
+
+    def summarize_overall_state(self, sink: Optional[Sink] = print) -> str:
         # 1. Users
+        users_block = self._users_block()
+
+        # 2. Messages (with formatting function)
+        messages_block = self.messages_api.as_pretty(sink=sink)
+
+        # 3. Summary
+        summary_block = self._summary_block()
+
+        return f"{users_block}\n\n{messages_block}\n\n{summary_block}"
+
+    def _users_block(self) -> str:
         user_lines = []
         for u in self.users:
             name_line = f"{u.first_name} {u.last_name} ({u.username})"
@@ -109,26 +263,20 @@ class ExternalState(BaseModel):
                 f"  - info: {u.information or 'not provided'}"
             )
         if user_lines:
-            users_block = "👤 Users:\n" + "\n".join(user_lines)
-        else:
-            users_block = "👤 Users: none"
+            return "👤 Users:\n" + "\n".join(user_lines)
+        return "👤 Users: none"
 
-        # 2. Messages (with formatting function)
-        messages_block = self.messages_api.as_pretty()
-
-        # 3. Summary
+    def _summary_block(self) -> str:
         if self.summary:
             summary_text = self.summary.strip()
             summary_tokens = count_tokens(summary_text)
         else:
             summary_text = "(No summary provided)"
             summary_tokens = 0
-            summary_block = f"📝 Summary ({summary_tokens} tokens):\n{summary_text}"
-
-        return f"{users_block}\n\n{messages_block}\n\n{summary_block}"
+        return f"📝 Summary ({summary_tokens} tokens):\n{summary_text}"
 
-    def show_last_reasoning(self) -> str:
+    def show_last_reasoning(self, sink: Optional[Sink] = print) -> str:
         if not self.last_reasoning:
             return "No messages available."
         api = self.last_reasoning_api
-        return api.as_pretty(truncate=1500)
+        return api.as_pretty(truncate=1500, sink=sink)
@@ -1,12 +1,20 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from bisect import bisect_right
 from datetime import datetime
+import time
 from uuid import UUID
 from conversation_states.humans import Human
-from .instruction import InstructionList
+from conversation_states.tokens import get_counter
+from .instruction import InstructionList, instruction_line
+from .utils.hashing import ContentHashed, Diff, Fingerprint, diff_fingerprints, json_hash, keyed
 
+SECTIONS = ("main", "preferences", "instructions", "temporary_intents", "other_info")
+# Which sections get the token budget first
+DEFAULT_PRIORITY = ("main", "instructions", "temporary_intents", "preferences", "other_info")
 
-class TemporaryStateItem(BaseModel):
+
+class TemporaryStateItem(ContentHashed):
     value: List[str]  # e.g. ["do not disturb", "exam at 12:30"]
     recorded_at: datetime  # when the status was recorded
     # until when this is expected to be relevant
@@ -14,12 +22,40 @@ class TemporaryStateItem(BaseModel):
     note: Optional[str] = None  # e.g. "finals week, needs quiet"
 
 
-class MemoryItem(BaseModel):
+def _timestamp(moment: Optional[datetime]) -> float:
+    # Naive datetimes are local time, same as datetime.now()
+    return time.time() if moment is None else moment.timestamp()
+
+
+class _ExpiryIndex:
+    # Positions of intents ordered by relevant_until; open-ended intents never expire
+    __slots__ = ("until", "positions", "open_ended")
+
+    def __init__(self, intents: List[TemporaryStateItem]):
+        dated = sorted(
+            (item.relevant_until.timestamp(), pos)
+            for pos, item in enumerate(intents) if item.relevant_until is not None)
+        self.until = [until for until, _ in dated]
+        self.positions = [pos for _, pos in dated]
+        self.open_ended = [pos for pos, item in enumerate(intents) if item.relevant_until is None]
+
+    def active(self, at: float) -> List[int]:
+        # Intents still relevant after `at`, in list order
+        return sorted(self.open_ended + self.positions[bisect_right(self.until, at):])
+
+    def expired(self, at: float) -> List[int]:
+        return self.positions[:bisect_right(self.until, at)]
+
+    def next_expiry(self) -> Optional[float]:
+        return self.until[0] if self.until else None
+
+
+class MemoryItem(ContentHashed):
     key: str  # e.g. "location"
     value: List[str]  # e.g. ["New York"]
 
 
-class MemoryList(BaseModel):
+class MemoryList(ContentHashed):
     category: str  # e.g. "main"
     memories: List[MemoryItem] = Field(default_factory=list)
 
@@ -32,7 +68,7 @@ class HumanProfile(BaseModel):
     preferences: MemoryList = Field(
         default_factory=lambda: MemoryList(category="preferences"))
     instructions: InstructionList = Field(
-        default_factory=list)  # e.g. "greet with emoji"
+        default_factory=InstructionList)  # e.g. "greet with emoji"
     temporary_intents: List[TemporaryStateItem] = Field(
         default_factory=list)  # e.g. "feeling overwhelmed today"
     other_info: List[MemoryList] = Field(
@@ -40,18 +76,197 @@ class HumanProfile(BaseModel):
     thread_id: UUID
     user: Human
 
-    def to_prompt(self) -> str:
-        # Returns user state formatted for LLM prompt
-        pass
+    # section -> (fingerprint, header, [(item, line, tokens)])
+    _prompt_cache: Dict[str, Tuple[Any, str, List[Tuple[Any, str, int]]]] = PrivateAttr(
+        default_factory=dict)
+
+    # (temporary_intents fingerprint, index); intents are edited in place, so the content is the key
+    _expiry: Optional[Tuple[str, _ExpiryIndex]] = PrivateAttr(default=None)
+
+    def _expiry_index(self) -> _ExpiryIndex:
+        fingerprint = self._section_fingerprint("temporary_intents")
+        cached = self._expiry
+        if cached is None or cached[0] != fingerprint:
+            cached = self._expiry = (fingerprint, _ExpiryIndex(self.temporary_intents))
+        return cached[1]
+
+    def active_intents(self, at: Optional[datetime] = None) -> List[TemporaryStateItem]:
+        intents = self.temporary_intents
+        return [intents[pos] for pos in self._expiry_index().active(_timestamp(at))]
+
+    def next_expiry(self) -> Optional[datetime]:
+        index = self._expiry_index()
+        if not index.positions:
+            return None
+        return self.temporary_intents[index.positions[0]].relevant_until
+
+    def drop_expired(self, at: Optional[datetime] = None) -> int:
+        # Removes intents whose relevant_until has passed, returns how many were dropped
+        now = _timestamp(at)
+        intents = self.temporary_intents
+        gone = {pos for pos in self._expiry_index().expired(now)
+                if intents[pos].relevant_until is not None and intents[pos].relevant_until.timestamp() <= now}
+        if not gone:
+            return 0
+        self.temporary_intents = [item for pos, item in enumerate(intents) if pos not in gone]
+        return len(gone)
+
+    def _section_fingerprint(self, section: str) -> str:
+        # One serializer pass per section; item hashes are only needed once it changed
+        return json_hash(getattr(self, section))
+
+    def _section_items(self, section: str) -> Dict[str, str]:
+        if section in ("main", "preferences"):
+            return keyed((m.key, m.content_hash()) for m in getattr(self, section).memories)
+        if section == "instructions":
+            return keyed((i.key, i.content_hash()) for i in self.instructions.items)
+        if section == "temporary_intents":
+            return keyed((t.recorded_at.isoformat(), t.content_hash()) for t in self.temporary_intents)
+        return keyed(
+            (f"{memory_list.category}/{m.key}", m.content_hash())
+            for memory_list in self.other_info for m in memory_list.memories)
+
+    def fingerprint(self, previous: Optional[Fingerprint] = None) -> Fingerprint:
+        # Item maps of sections whose hash matches `previous` are reused as is
+        previous = previous or {}
+        result: Fingerprint = {}
+        for section in SECTIONS:
+            section_hash = self._section_fingerprint(section)
+            old = previous.get(section)
+            if old is not None and old[0] == section_hash:
+                result[section] = old
+            else:
+                result[section] = (section_hash, self._section_items(section))
+        return result
+
+    def _render_section(self, section: str) -> Tuple[str, List[Tuple[Any, str]]]:
+        if section in ("main", "preferences"):
+            memories = getattr(self, section).memories
+            return f"{section.capitalize()}:", [(m, _memory_line(m)) for m in memories]
+        if section == "instructions":
+            return "Instructions:", [(i, instruction_line(i)) for i in self.instructions.by_weight()]
+        if section == "temporary_intents":
+            return "Current state:", [(t, _intent_line(t)) for t in self.temporary_intents]
+        lines = []
+        for memory_list in self.other_info:
+            lines.extend((m, _memory_line(m, memory_list.category)) for m in memory_list.memories)
+        return "Other:", lines
+
+    def _section(self, section: str) -> Tuple[str, List[Tuple[Any, str, int]]]:
+        # Re-rendered and re-counted only when the section's content changed
+        fingerprint = self._section_fingerprint(section)
+        cached = self._prompt_cache.get(section)
+        if cached is None or cached[0] != fingerprint:
+            header, rendered = self._render_section(section)
+            counter = get_counter()
+            tokens = counter.count_many([line for _, line in rendered])
+            cached = (fingerprint, header, [
+                (item, line, n) for (item, line), n in zip(rendered, tokens)])
+            self._prompt_cache[section] = cached
+        return cached[1], cached[2]
+
+    def to_prompt(
+        self,
+        max_tokens: Optional[int] = None,
+        priority: Sequence[str] = DEFAULT_PRIORITY,
+        at: Optional[datetime] = None
+    ) -> str:
+        # Returns user state formatted for LLM prompt, filling sections by priority within max_tokens
+        counter = get_counter()
+        title = f"User @{self.user.username}: {self.user.first_name} {self.user.last_name or ''}".rstrip()
+        # Every line is charged one extra token for the newline joining it
+        budget = None if max_tokens is None else max_tokens - counter.count(title) - 1
+
+        chosen: Dict[str, Tuple[str, List[str]]] = {}
+        for section in priority:
+            header, items = self._section(section)
+            if section == "temporary_intents":
+                items = [items[pos] for pos in self._expiry_index().active(_timestamp(at))]
+            if not items:
+                continue
+            lines = []
+            if budget is not None:
+                header_tokens = counter.count(header) + 1
+                if header_tokens >= budget:
+                    continue
+                left = budget - header_tokens
+                for _, line, tokens in items:
+                    if tokens + 1 <= left:
+                        lines.append(line)
+                        left -= tokens + 1
+                if lines:
+                    budget = left
+            else:
+                lines = [line for _, line, _ in items]
+            if lines:
+                chosen[section] = (header, lines)
+
+        blocks = [title]
+        for section in SECTIONS:
+            if section in chosen:
+                header, lines = chosen[section]
+                blocks.append(header + "\n" + "\n".join(lines))
+        return "\n".join(blocks)
 
     def update(self, **kwargs) -> None:
         # Updates specific fields of the state in-place
-        pass
+        fields = type(self).model_fields
+        for name, value in kwargs.items():
+            if name not in fields:
+                raise AttributeError(f"HumanProfile has no field {name!r}")
+            setattr(self, name, value)
 
-    def diff(self, other: 'HumanProfile') -> dict:
-        # Compares current state with another and returns a diff dict
-        pass
+    def diff(self, other: 'HumanProfile') -> Diff:
+        # Keys added, removed and changed per section going from self to other; identical sections are skipped
+        old: Fingerprint = {}
+        new: Fingerprint = {}
+        for section in SECTIONS:
+            old_hash = self._section_fingerprint(section)
+            new_hash = other._section_fingerprint(section)
+            if old_hash != new_hash:
+                old[section] = (old_hash, self._section_items(section))
+                new[section] = (new_hash, other._section_items(section))
+        return diff_fingerprints(old, new)
 
     def explain_state(self) -> str:
         # Returns a natural language explanation of the state
-        pass
+        name = self.user.preferred_name or self.user.first_name
+        active = self.active_intents()
+        parts = [
+            f"{len(self.main.memories)} core facts",
+            f"{len(self.preferences.memories)} preferences",
+            f"{len(self.instructions.items)} instructions",
+            f"{len(active)} active temporary states",
+        ]
+        text = f"{name} (@{self.user.username}) has " + ", ".join(parts) + "."
+        if self.other_info:
+            text += " Other info: " + ", ".join(m.category for m in self.other_info) + "."
+        if active:
+            text += " Right now: " + "; ".join(", ".join(t.value) for t in active) + "."
+        return text
+
+
+def _memory_line(memory: MemoryItem, category: Optional[str] = None) -> str:
+    key = f"{category}/{memory.key}" if category else memory.key
+    return f"- {key}: {', '.join(memory.value)}"
+
+
+def _intent_line(item: TemporaryStateItem) -> str:
+    line = f"- {', '.join(item.value)}"
+    if item.relevant_until:
+        line += f" (until {item.relevant_until:%Y-%m-%d %H:%M})"
+    if item.note:
+        line += f" — {item.note}"
+    return line
+
+
+
+def sweep_expired(profiles: Iterable[HumanProfile], at: Optional[datetime] = None) -> int:
+    # One pass over many profiles; a profile with nothing expired costs a hash and a comparison
+    now = _timestamp(at)
+    dropped = 0
+    for profile in profiles:
+        next_expiry = profile._expiry_index().next_expiry()
+        if next_expiry is not None and next_expiry <= now:
+            dropped += profile.drop_expired(at)
+    return dropped
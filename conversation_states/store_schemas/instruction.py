@@ -1,6 +1,23 @@
-from pydantic import BaseModel, Field
-from typing import List
+import heapq
+import re
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
 from uuid import UUID
+from conversation_states.tokens import get_counter, message_text
+from .utils.hashing import ContentHashed, json_hash
+
+_WORD = re.compile(r"\w{3,}")
+# Function words and words every condition uses ("only if the user ...") match any message
+STOPWORDS = frozenset("""
+    the and not but for nor yet with without when whenever while what which who whom whose why how
+    where only also just than then that this these those there here from into onto about above
+    below after before over under again any all some each every both few more most other such own
+    same very can could will would shall should may might must does did doing done has have had
+    having are was were been being its his her hers him she they them their theirs you your yours
+    our ours out off too isn aren wasn weren don doesn didn won wouldn shouldn
+    user users bot assistant talks talk talking asks ask asking says say mentions mention wants want
+    если когда только что как это для при или так уже его она они пользователь пользователя бот
+""".split())
 
 
 class ExampleItem(BaseModel):
@@ -8,7 +25,7 @@ class ExampleItem(BaseModel):
     output: str  # e.g. "[Bot avoids small talk.]"
 
 
-class InstructionItem(BaseModel):
+class InstructionItem(ContentHashed):
     key: str  # e.g. "greeting_style"
     value: str  # e.g. "friendly but concise"
     examples: List[ExampleItem] = Field(default_factory=list)
@@ -17,10 +34,78 @@ class InstructionItem(BaseModel):
     condition: str  # e.g. "Only if user is not tired"
 
 
-class InstructionList(BaseModel):
+class SelectedInstruction(NamedTuple):
+    item: InstructionItem
+    examples: List[ExampleItem]
+    anti_examples: List[ExampleItem]
+
+    def lines(self) -> List[str]:
+        return ([instruction_line(self.item)]
+                + [example_line(e) for e in self.examples]
+                + [example_line(e, anti=True) for e in self.anti_examples])
+
+
+def _terms(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower())) - STOPWORDS
+
+
+class _InstructionIndex:
+    __slots__ = ("by_key", "by_weight", "conditional", "postings")
+
+    def __init__(self, items: List[InstructionItem]):
+        self.by_key = {item.key: item for item in items}
+        # sorted() is stable: equal weights keep list order
+        self.by_weight = sorted(items, key=lambda item: -item.weight)
+        self.conditional = [bool(item.condition.strip()) for item in self.by_weight]
+        # term -> ranks in by_weight, ascending
+        self.postings: Dict[str, List[int]] = {}
+        for rank, item in enumerate(self.by_weight):
+            text = " ".join([item.condition] + [
+                f"{e.input} {e.output}" for e in item.examples + item.anti_examples])
+            for term in _terms(text):
+                self.postings.setdefault(term, []).append(rank)
+
+    def relevant(self, terms: Set[str]) -> Iterator[InstructionItem]:
+        # Unconditional instructions always apply, conditional ones when a keyword matches
+        matched: Set[int] = set()
+        for term in terms:
+            matched.update(self.postings.get(term, ()))
+        for rank, item in enumerate(self.by_weight):
+            if not self.conditional[rank] or rank in matched:
+                yield item
+
+
+class InstructionList(ContentHashed):
     items: List[InstructionItem] = Field(
         default_factory=list)  # e.g., [InstructionItem(...)]
 
+    # (items fingerprint, index); items are edited in place, so the content is the key
+    _index: Optional[Tuple[str, _InstructionIndex]] = PrivateAttr(default=None)
+
+    def index(self) -> _InstructionIndex:
+        fingerprint = json_hash(self.items)
+        cached = self._index
+        if cached is None or cached[0] != fingerprint:
+            cached = self._index = (fingerprint, _InstructionIndex(self.items))
+        return cached[1]
+
+    def get(self, key: str) -> Optional[InstructionItem]:
+        return self.index().by_key.get(key)
+
+    def by_weight(self) -> List[InstructionItem]:
+        return self.index().by_weight
+
+    def relevant(self, message: Any) -> Iterator[InstructionItem]:
+        return self.index().relevant(_terms(message_text(message)))
+
+    def select(
+        self,
+        message: Any,
+        max_tokens: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[SelectedInstruction]:
+        return select_instructions(message, self, max_tokens=max_tokens, limit=limit)
+
 
 class ThreadInstructionList(InstructionList):
     thread_id: UUID
@@ -29,3 +114,65 @@ class ThreadInstructionList(InstructionList):
 class GlobalInstructionList(InstructionList):
     # TODO needed?
     pass
+
+
+def merge_instructions(
+    thread: InstructionList,
+    global_: Optional[InstructionList] = None,
+    message: Any = None
+) -> Iterator[InstructionItem]:
+    # Both lists are already weight-ordered, so merging is lazy; thread entries override global ones by key
+    if message is None:
+        own, other = iter(thread.by_weight()), iter(global_.by_weight() if global_ else ())
+    else:
+        own, other = thread.relevant(message), global_.relevant(message) if global_ else iter(())
+    overridden = thread.index().by_key
+    other = (item for item in other if item.key not in overridden)
+    return heapq.merge(own, other, key=lambda item: -item.weight)
+
+
+def select_instructions(
+    message: Any,
+    thread: InstructionList,
+    global_: Optional[InstructionList] = None,
+    max_tokens: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[SelectedInstruction]:
+    # Highest weight relevant instructions that fit, then their examples while the budget lasts
+    counter = get_counter()
+    left = max_tokens
+    chosen: List[SelectedInstruction] = []
+    for item in merge_instructions(thread, global_, message):
+        if limit is not None and len(chosen) >= limit:
+            break
+        if left is not None:
+            if left < 2:
+                break
+            tokens = counter.count(instruction_line(item)) + 1  # + newline
+            if tokens > left:
+                continue
+            left -= tokens
+        chosen.append(SelectedInstruction(item, [], []))
+
+    for selected in chosen:
+        for bucket, pool, anti in ((selected.examples, selected.item.examples, False),
+                                   (selected.anti_examples, selected.item.anti_examples, True)):
+            for example in pool:
+                if left is not None:
+                    tokens = counter.count(example_line(example, anti)) + 1
+                    if tokens > left:
+                        continue
+                    left -= tokens
+                bucket.append(example)
+    return chosen
+
+
+def instruction_line(item: InstructionItem) -> str:
+    line = f"- {item.key}: {item.value}"
+    if item.condition:
+        line += f" (when: {item.condition})"
+    return line
+
+
+def example_line(example: ExampleItem, anti: bool = False) -> str:
+    return f"  {'not' if anti else 'e.g.'}: \"{example.input}\" -> {example.output}"
@@ -0,0 +1,239 @@
+"""Batched, cached load/save of store_schemas models in a LangGraph BaseStore.
+
+Layout: every model lives in namespace `prefix + (kind, thread_id, key)`, one store item per
+top-level field plus a `__meta__` item holding a version token. A turn loads all the profiles
+it needs in one `store.batch`, and saving writes only the fields that changed since the model
+was loaded or last saved.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Type
+from uuid import uuid4
+from pydantic import BaseModel
+from langgraph.store.base import BaseStore, GetOp, PutOp
+from .human_profile import HumanProfile
+from .instruction import ThreadInstructionList
+from .schedule import ScheduleList
+from .task import TaskList
+from .utils.hashing import json_hash
+
+META_KEY = "__meta__"
+
+# model class -> (kind, model -> (thread_id, key))
+KINDS: Dict[Type[BaseModel], Tuple[str, Callable[[Any], Tuple[str, str]]]] = {
+    HumanProfile: ("profiles", lambda m: (str(m.thread_id), m.user.username)),
+    ThreadInstructionList: ("instructions", lambda m: (str(m.thread_id), "thread")),
+    TaskList: ("tasks", lambda m: (str(m.thread_id), "tasks")),
+    ScheduleList: ("schedules", lambda m: (str(m.thread_id), "schedules")),
+}
+
+# (model class, thread_id, key); key is the username for profiles
+Ref = Tuple[Type[BaseModel], Any, str]
+
+
+def default_key(cls: Type[BaseModel]) -> str:
+    return {ThreadInstructionList: "thread", TaskList: "tasks", ScheduleList: "schedules"}[cls]
+
+
+def field_fingerprint(model: BaseModel, field: str) -> str:
+    # Always from the serialized value: nested lists are edited in place
+    return json_hash(getattr(model, field))
+
+
+class _Entry:
+    __slots__ = ("model", "version", "fingerprints", "expires")
+
+    def __init__(self, model: BaseModel, version: str, fingerprints: Dict[str, str], expires: float):
+        self.model = model
+        self.version = version
+        self.fingerprints = fingerprints
+        self.expires = expires
+
+
+class ModelCache:
+    """Per-process LRU of loaded models with a time-to-live."""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+
+    def get(self, key: Hashable, stale: bool = False) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not stale and entry.expires <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, model: BaseModel, version: str, fingerprints: Dict[str, str]) -> None:
+        self._entries[key] = _Entry(model, version, fingerprints, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class StoreRepository:
+    """Loads and saves HumanProfile, ThreadInstructionList, TaskList and ScheduleList.
+
+    Models handed out are the cached instances: edit them, then `save` them.
+    """
+
+    def __init__(
+        self,
+        store: BaseStore,
+        prefix: Tuple[str, ...] = (),
+        cache: Optional[ModelCache] = None,
+    ):
+        self.store = store
+        self.prefix = tuple(prefix)
+        self.cache = cache if cache is not None else ModelCache()
+        self.round_trips = 0
+
+    # --- addressing ---
+
+    def namespace(self, cls: Type[BaseModel], thread_id: Any, key: str) -> Tuple[str, ...]:
+        return self.prefix + (KINDS[cls][0], str(thread_id), key)
+
+    def ref(self, model: BaseModel) -> Ref:
+        thread_id, key = KINDS[type(model)][1](model)
+        return type(model), thread_id, key
+
+    # --- loading ---
+
+    def _plan_load(self, refs: Sequence[Ref], revalidate: bool):
+        # Cache hits need no ops; misses (or, with revalidate, every ref) read meta + fields
+        ops: List[GetOp] = []
+        slots: List[Tuple[int, Ref, int, int]] = []  # (position, ref, first op, op count)
+        found: List[Optional[BaseModel]] = [None] * len(refs)
+        for pos, (cls, thread_id, key) in enumerate(refs):
+            ref = (cls, str(thread_id), key)
+            entry = self.cache.get(ref, stale=revalidate)
+            if entry is not None and not revalidate:
+                found[pos] = entry.model
+                continue
+            ns = self.namespace(cls, thread_id, key)
+            first = len(ops)
+            ops.append(GetOp(ns, META_KEY))
+            ops.extend(GetOp(ns, field) for field in cls.model_fields)
+            slots.append((pos, ref, first, len(ops) - first))
+        return ops, slots, found
+
+    def _finish_load(self, results: list, slots, found: List[Optional[BaseModel]]) -> List[Optional[BaseModel]]:
+        for pos, ref, first, count in slots:
+            meta = results[first]
+            if meta is None:
+                self.cache.pop(ref)
+                continue
+            version = meta.value["version"]
+            entry = self.cache.get(ref, stale=True)
+            if entry is not None and entry.version == version:
+                # Unchanged in the store: keep the instance, just renew its lifetime
+                self.cache.put(ref, entry.model, version, entry.fingerprints)
+                found[pos] = entry.model
+                continue
+            cls = ref[0]
+            data = {}
+            for field, item in zip(cls.model_fields, results[first + 1:first + count]):
+                if item is not None:
+                    data[field] = item.value["value"]
+            model = cls.model_validate(data)
+            self.cache.put(ref, model, version, {f: field_fingerprint(model, f) for f in cls.model_fields})
+            found[pos] = model
+        return found
+
+    def load_many(self, refs: Sequence[Ref], revalidate: bool = False) -> List[Optional[BaseModel]]:
+        # One store round trip for every model that is not cached; None for models never saved.
+        # revalidate=True also re-reads cached models, rebuilding only those whose version moved
+        ops, slots, found = self._plan_load(refs, revalidate)
+        if ops:
+            self.round_trips += 1
+            found = self._finish_load(self.store.batch(ops), slots, found)
+        return found
+
+    async def aload_many(self, refs: Sequence[Ref], revalidate: bool = False) -> List[Optional[BaseModel]]:
+        ops, slots, found = self._plan_load(refs, revalidate)
+        if ops:
+            self.round_trips += 1
+            found = self._finish_load(await self.store.abatch(ops), slots, found)
+        return found
+
+    def load(self, cls: Type[BaseModel], thread_id: Any, key: Optional[str] = None) -> Optional[BaseModel]:
+        return self.load_many([(cls, thread_id, key or default_key(cls))])[0]
+
+    def profiles(self, thread_id: Any, usernames: Iterable[str]) -> Dict[str, Optional[HumanProfile]]:
+        # Every participant of a group chat in one round trip
+        usernames = list(usernames)
+        models = self.load_many([(HumanProfile, thread_id, name) for name in usernames])
+        return dict(zip(usernames, models))
+
+    # --- saving ---
+
+    def _plan_save(self, models: Iterable[BaseModel]):
+        ops: List[PutOp] = []
+        updates = []
+        for model in models:
+            cls, thread_id, key = self.ref(model)
+            ref = (cls, str(thread_id), key)
+            entry = self.cache.get(ref, stale=True)
+            fingerprints = {f: field_fingerprint(model, f) for f in cls.model_fields}
+            previous = entry.fingerprints if entry is not None and entry.model is model else {}
+            dirty = [f for f, fp in fingerprints.items() if previous.get(f) != fp]
+            if not dirty:
+                continue
+            ns = self.namespace(cls, thread_id, key)
+            dumped = model.model_dump(mode="json", include=set(dirty))
+            ops.extend(PutOp(ns, field, {"value": dumped[field]}) for field in dirty)
+            version = uuid4().hex
+            ops.append(PutOp(ns, META_KEY, {"version": version}))
+            updates.append((ref, model, version, fingerprints))
+        return ops, updates
+
+    def _finish_save(self, updates) -> int:
+        for ref, model, version, fingerprints in updates:
+            self.cache.put(ref, model, version, fingerprints)
+        return len(updates)
+
+    def save_many(self, models: Iterable[BaseModel]) -> int:
+        # Writes only changed fields of all models in one round trip; returns how many models were written
+        ops, updates = self._plan_save(models)
+        if ops:
+            self.round_trips += 1
+            self.store.batch(ops)
+        return self._finish_save(updates)
+
+    async def asave_many(self, models: Iterable[BaseModel]) -> int:
+        ops, updates = self._plan_save(models)
+        if ops:
+            self.round_trips += 1
+            await self.store.abatch(ops)
+        return self._finish_save(updates)
+
+    def save(self, *models: BaseModel) -> int:
+        return self.save_many(models)
+
+    def delete(self, model: BaseModel) -> None:
+        cls, thread_id, key = self.ref(model)
+        ns = self.namespace(cls, thread_id, key)
+        self.round_trips += 1
+        self.store.batch([PutOp(ns, field, None) for field in [META_KEY, *cls.model_fields]])
+        self.cache.pop((cls, str(thread_id), key))
+
+    def invalidate(self, cls: Optional[Type[BaseModel]] = None, thread_id: Any = None, key: Optional[str] = None) -> None:
+        # Drops one cached model, or everything when called without arguments
+        if cls is None:
+            self.cache.clear()
+        else:
+            self.cache.pop((cls, str(thread_id), key or default_key(cls)))
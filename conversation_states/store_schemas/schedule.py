@@ -1,11 +1,32 @@
 # file: schedule_models.py
-from pydantic import BaseModel, field_validator
-from typing import Optional, List, Literal
-from datetime import datetime
-from .task import ActionItem, Task
+import heapq
+from copy import copy
+from functools import lru_cache
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, List, Literal, Set, Tuple
+from datetime import datetime, timedelta
+from .task import ActionItem, ApproximateDateTime, Task
 from conversation_states import Human
-from uuid import UUID
-from croniter import croniter, CroniterBadCronError
+from uuid import UUID, uuid4
+
+if TYPE_CHECKING:
+    from croniter import croniter
+
+# croniter's get_next is exclusive; starting one tick early makes a start time inclusive
+_TICK = timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=1024)
+def _compiled(expression: str) -> "croniter":
+    # Parsed once per expression; iterators are cheap copies of this template
+    from croniter import croniter
+    return croniter(expression, datetime(2000, 1, 1), ret_type=datetime)
+
+
+def cron_iter(expression: str, start: datetime) -> "croniter":
+    it = copy(_compiled(expression))
+    it.set_current(start, force=True)
+    return it
 
 
 class CronExpression(BaseModel):
@@ -15,36 +36,125 @@ class CronExpression(BaseModel):
     @field_validator("expression")
     @classmethod
     def validate_cron(cls, v: str) -> str:
-        try:
-            croniter(v)
-        except CroniterBadCronError:
+        from croniter import croniter
+        if not croniter.is_valid(v):
             raise ValueError(f"Invalid cron expression: {v}")
         return v
 
 
 class Schedule(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid4()))
     frequency: CronExpression
     reply_to: Optional[Human] = None  # ID or name of the human to notify
     requested_by: Optional[Human] = None  # additional info
     action: ActionItem
     ends_at: Optional[datetime] = None
 
+    def to_task(self, fire_at: datetime) -> Task:
+        return Task(
+            id=f"{self.id}:{fire_at.isoformat()}",
+            time=ApproximateDateTime(target=fire_at),
+            requested_by=self.requested_by,
+            reply_to=self.reply_to,
+            action=self.action,
+        )
+
+
+class CronScheduler:
+    """Min-heap of next fire times across schedules; each tick only touches schedules that are due."""
+
+    def __init__(self, schedules: Iterable[Schedule] = (), start: Optional[datetime] = None):
+        self.start = start or datetime.now()
+        # Everything up to here has been handed out by due(); fires at `start` itself are still due
+        self.until = self.start - _TICK
+        self._heap: List[Tuple[datetime, int, str, int]] = []
+        self._iters: Dict[str, "croniter"] = {}
+        self._schedules: Dict[str, Schedule] = {}
+        # Bumped on every add, so heap entries left over from a removed or replaced schedule are skipped
+        self._generations: Dict[str, int] = {}
+        self._seq = 0
+        for schedule in schedules:
+            self.add(schedule)
+
+    def _push(self, schedule_id: str) -> None:
+        schedule = self._schedules[schedule_id]
+        fire_at = self._iters[schedule_id].get_next(datetime)
+        if schedule.ends_at is not None and fire_at > schedule.ends_at:
+            self.remove(schedule_id)
+            return
+        self._seq += 1
+        heapq.heappush(self._heap, (fire_at, self._seq, schedule_id, self._generations[schedule_id]))
+
+    def _live(self, schedule_id: str, generation: int) -> bool:
+        return schedule_id in self._schedules and self._generations[schedule_id] == generation
+
+    def add(self, schedule: Schedule, start: Optional[datetime] = None) -> None:
+        # Starts where due() got to, so a late addition does not backfill past fire times;
+        # an explicit start is inclusive
+        self._schedules[schedule.id] = schedule
+        self._generations[schedule.id] = self._generations.get(schedule.id, 0) + 1
+        self._iters[schedule.id] = cron_iter(
+            schedule.frequency.expression, start - _TICK if start is not None else self.until)
+        self._push(schedule.id)
+
+    def remove(self, schedule_id: str) -> None:
+        # Heap entries of removed schedules are skipped lazily when they surface
+        self._schedules.pop(schedule_id, None)
+        self._iters.pop(schedule_id, None)
+
+    def next_fire(self) -> Optional[datetime]:
+        while self._heap and not self._live(*self._heap[0][2:]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, until: datetime) -> List[Tuple[datetime, Schedule]]:
+        fired = []
+        heap = self._heap
+        while heap and heap[0][0] <= until:
+            fire_at, _, schedule_id, generation = heapq.heappop(heap)
+            if not self._live(schedule_id, generation):
+                continue
+            fired.append((fire_at, self._schedules[schedule_id]))
+            self._push(schedule_id)
+        self.until = max(self.until, until)
+        return fired
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
 
 class ScheduleList(BaseModel):
     thread_id: UUID
     schedules: List[Schedule]
 
+    _scheduler: Optional[CronScheduler] = PrivateAttr(default=None)
+
     def add(self, schedules: List[Schedule]) -> None:
         # Adds schedules to the manager
-        pass
+        self.schedules.extend(schedules)
+        if self._scheduler is not None:
+            for schedule in schedules:
+                self._scheduler.add(schedule)
 
-    def get():
-        pass
+    def get(self, schedule_id: str) -> Optional[Schedule]:
+        for schedule in self.schedules:
+            if schedule.id == schedule_id:
+                return schedule
+        return None
 
     def remove_by_id(self, schedule_ids: List[str]) -> None:
         # Removes schedules by their ID
-        pass
+        ids: Set[str] = set(schedule_ids)
+        self.schedules = [s for s in self.schedules if s.id not in ids]
+        if self._scheduler is not None:
+            for schedule_id in ids:
+                self._scheduler.remove(schedule_id)
 
-    def generate_tasks(self, date: Optional[datetime] = None) -> List[Task]:
-        # Generates tasks for the given date (defaults to now) based on active schedules
-        pass
+    def generate_tasks(self, date: Optional[datetime] = None, horizon: timedelta = timedelta(days=1)) -> List[Task]:
+        # Tasks for every fire time in [date, date + horizon] (date defaults to now).
+        # The first call starts the schedules at date; later calls continue where the last one stopped.
+        date = date or datetime.now()
+        if self._scheduler is None:
+            self._scheduler = CronScheduler(self.schedules, start=date)
+        return [schedule.to_task(fire_at)
+                for fire_at, schedule in self._scheduler.due(date + horizon)]
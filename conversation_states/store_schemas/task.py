@@ -1,9 +1,11 @@
 # file: task_models.py
-from pydantic import BaseModel
-from typing import Optional, Literal, List
-from datetime import datetime
+from pydantic import BaseModel, Field, GetCoreSchemaHandler, PrivateAttr
+from pydantic_core import core_schema
+from typing import Any, Dict, Optional, Literal, List, Tuple
+from datetime import datetime, timedelta
+from random import random
+from uuid import uuid4
 
-from sqlalchemy import Boolean
 from conversation_states import Human
 
 
@@ -21,33 +23,274 @@ class ApproximateDateTime(BaseModel):
 
     def get_range(self) -> tuple[datetime, datetime]:
         # Returns start and end of time range window
-        pass
+        return (self.target - timedelta(hours=self.hr_before),
+                self.target + timedelta(hours=self.hr_after))
 
     def in_range(self, date: datetime) -> bool:
         # Checks if given date falls within the time range window
-        pass
+        start, end = self.get_range()
+        return start <= date <= end
 
 
 class Task(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid4()))
     time: ApproximateDateTime
     requested_by: Optional[Human]
     reply_to: Optional[Human]
     action: ActionItem
-    completed_at: datetime
+    completed_at: Optional[datetime] = None
+
+
+class _Window:
+    __slots__ = ("key", "start", "end", "priority", "left", "right", "max_end")
+
+    def __init__(self, start: datetime, end: datetime, task_id: str):
+        self.key = (start, task_id)
+        self.start = start
+        self.end = end
+        self.priority = random()
+        self.left: Optional["_Window"] = None
+        self.right: Optional["_Window"] = None
+        self.max_end = end
+
+
+def _pull(node: _Window) -> None:
+    # max_end: the latest window end anywhere in the subtree
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+
+def _rotate_right(node: _Window) -> _Window:
+    top = node.left
+    node.left, top.right = top.right, node
+    _pull(node)
+    _pull(top)
+    return top
+
+
+def _rotate_left(node: _Window) -> _Window:
+    top = node.right
+    node.right, top.left = top.left, node
+    _pull(node)
+    _pull(top)
+    return top
+
+
+def _insert(node: Optional[_Window], new: _Window) -> _Window:
+    if node is None:
+        return new
+    if new.key < node.key:
+        node.left = _insert(node.left, new)
+        if node.left.priority > node.priority:
+            return _rotate_right(node)
+    else:
+        node.right = _insert(node.right, new)
+        if node.right.priority > node.priority:
+            return _rotate_left(node)
+    _pull(node)
+    return node
+
+
+def _merge(left: Optional[_Window], right: Optional[_Window]) -> Optional[_Window]:
+    # Every key in `left` sorts before every key in `right`
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _pull(left)
+        return left
+    right.left = _merge(left, right.left)
+    _pull(right)
+    return right
+
+
+def _delete(node: Optional[_Window], key: Tuple[datetime, str]) -> Optional[_Window]:
+    if node is None:
+        return None
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    elif node.key < key:
+        node.right = _delete(node.right, key)
+    else:
+        return _merge(node.left, node.right)
+    _pull(node)
+    return node
+
+
+def _collect(node: Optional[_Window], from_date: datetime, to_date: datetime, found: List[str]) -> None:
+    # In start order; subtrees that end before from_date or start after to_date are skipped
+    if node is None or node.max_end < from_date:
+        return
+    _collect(node.left, from_date, to_date, found)
+    if node.start <= to_date:
+        if node.end >= from_date:
+            found.append(node.key[1])
+        _collect(node.right, from_date, to_date, found)
+
+
+class _WindowIndex:
+    """Interval treap of task windows keyed by (start, id), with the latest end per subtree.
+
+    insert/delete are O(log n) expected; an overlap query is O((k + 1) log n) for k hits.
+    """
+
+    __slots__ = ("root",)
+
+    def __init__(self, tasks: List[Task]):
+        self.root: Optional[_Window] = None
+        for task in tasks:
+            self.insert(task)
+
+    def insert(self, task: Task) -> None:
+        self.root = _insert(self.root, _Window(*task.time.get_range(), task.id))
+
+    def delete(self, task: Task) -> None:
+        start, _ = task.time.get_range()
+        self.root = _delete(self.root, (start, task.id))
+
+    def overlapping(self, from_date: datetime, to_date: datetime) -> List[str]:
+        found: List[str] = []
+        _collect(self.root, from_date, to_date, found)
+        return found
+
+
+class TaskSeq(list):
+    """Task list that counts in-place changes other than appends, so TaskList knows when to reindex.
+
+    Same contract as MessageList: appends extend the index, anything else bumps `mutations`.
+    """
+
+    __slots__ = ("mutations",)
+
+    def __init__(self, tasks=()):
+        super().__init__(tasks)
+        self.mutations = 0
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_after_validator_function(_unique_tasks, handler.generate_schema(list[Task]))
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.mutations += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.mutations += 1
+
+    def __imul__(self, n):
+        self.mutations += 1
+        return super().__imul__(n)
+
+    def insert(self, pos, value):
+        super().insert(pos, value)
+        self.mutations += 1
+
+    def pop(self, pos=-1):
+        self.mutations += 1
+        return super().pop(pos)
+
+    def remove(self, value):
+        super().remove(value)
+        self.mutations += 1
+
+    def clear(self):
+        super().clear()
+        self.mutations += 1
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.mutations += 1
+
+    def reverse(self):
+        super().reverse()
+        self.mutations += 1
+
+
+def _unique_tasks(tasks: List[Task]) -> TaskSeq:
+    # First task wins for a repeated id, same as TaskList.add
+    seen = set()
+    unique = TaskSeq()
+    for task in tasks:
+        if task.id not in seen:
+            seen.add(task.id)
+            list.append(unique, task)
+    return unique
 
 
 class TaskList(BaseModel):
+    """Tasks of one thread with an id map and a window index for date queries.
+
+    The index follows appends and any in-place edit of `tasks`; a task whose time is changed
+    in place must be re-added (remove_by_id + add) to move its window.
+    """
+
     thread_id: str
-    tasks: List[Task]
+    tasks: TaskSeq
+
+    # (tasks list it was built for, its length and mutation count then, id map, window index)
+    _index: Optional[Tuple[list, int, int, Dict[str, Task], _WindowIndex]] = PrivateAttr(default=None)
+
+    def _windows(self) -> Tuple[Dict[str, Task], _WindowIndex]:
+        tasks = self.tasks
+        if not isinstance(tasks, TaskSeq):
+            # A plain list was assigned: dedupe it and track it from now on
+            tasks = self.__dict__["tasks"] = _unique_tasks(tasks)
+        index = self._index
+        if index is None or index[0] is not tasks or index[2] != tasks.mutations or index[1] > len(tasks):
+            by_id: Dict[str, Task] = {}
+            windows = _WindowIndex([])
+            size = 0
+        else:
+            _, size, _, by_id, windows = index
+        # Repeated ids are indexed once, first wins; `add` never appends them
+        for task in tasks[size:]:
+            if task.id not in by_id:
+                by_id[task.id] = task
+                windows.insert(task)
+        self._index = (tasks, len(tasks), tasks.mutations, by_id, windows)
+        return by_id, windows
+
+    def get(self, task_id: str) -> Optional[Task]:
+        return self._windows()[0].get(task_id)
 
     def get_by_date(self, from_date: datetime, to_date: datetime) -> List[Task]:
-        # Returns tasks within a date range
-        pass
+        # Returns tasks whose [target - hr_before, target + hr_after] window overlaps the range
+        by_id, windows = self._windows()
+        return [by_id[task_id] for task_id in windows.overlapping(from_date, to_date)]
+
+    def due_at(self, date: datetime) -> List[Task]:
+        return self.get_by_date(date, date)
 
-    def add(self, tasks: List[Task]) -> Boolean:
-        # Adds new tasks to the list
-        pass
+    def add(self, tasks: List[Task]) -> bool:
+        # Adds new tasks to the list, skipping ids that are already present
+        by_id, windows = self._windows()
+        added = False
+        for task in tasks:
+            if task.id in by_id:
+                continue
+            self.tasks.append(task)
+            by_id[task.id] = task
+            windows.insert(task)
+            added = True
+        self._index = (self.tasks, len(self.tasks), self.tasks.mutations, by_id, windows)
+        return added
 
-    def remove_by_id(self, task_ids: List[str]) -> Boolean:
+    def remove_by_id(self, task_ids: List[str]) -> bool:
         # Removes tasks by ID
-        pass
+        by_id, windows = self._windows()
+        removed = [by_id.pop(task_id) for task_id in set(task_ids) if task_id in by_id]
+        if not removed:
+            return False
+        for task in removed:
+            windows.delete(task)
+        gone = {task.id for task in removed}
+        self.tasks = TaskSeq(t for t in self.tasks if t.id not in gone)
+        self._index = (self.tasks, len(self.tasks), 0, by_id, windows)
+        return True
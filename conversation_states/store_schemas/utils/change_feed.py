@@ -0,0 +1,47 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, NamedTuple, Optional
+from .hashing import Diff, Fingerprint, diff_fingerprints
+
+
+class ProfileChange(NamedTuple):
+    key: Hashable
+    profile: Any
+    changes: Diff  # section -> {"added": [...], "removed": [...], "changed": [...]}
+
+
+def profile_key(profile: Any) -> Hashable:
+    return profile.thread_id, profile.user.username
+
+
+class ChangeFeed:
+    """Emits only what changed between consecutive snapshots of each profile.
+
+    Keeps one fingerprint per profile (hashes, never the profile itself), so an unchanged
+    section costs one hash of its JSON and no per-item work.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable] = profile_key):
+        self._key = key
+        self._seen: Dict[Hashable, Fingerprint] = {}
+
+    def push(self, profile: Any) -> Optional[ProfileChange]:
+        key = self._key(profile)
+        previous = self._seen.get(key)
+        fingerprint = profile.fingerprint(previous)
+        self._seen[key] = fingerprint
+        changes = diff_fingerprints(previous or {}, fingerprint)
+        return ProfileChange(key, profile, changes) if changes else None
+
+    def push_many(self, profiles: Iterable[Any]) -> Iterator[ProfileChange]:
+        for profile in profiles:
+            change = self.push(profile)
+            if change is not None:
+                yield change
+
+    def forget(self, key: Hashable) -> None:
+        self._seen.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
@@ -0,0 +1,59 @@
+import hashlib
+from typing import Any, Dict, Iterable, List, Tuple
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+# section -> (section hash, {item key: item hash})
+Fingerprint = Dict[str, Tuple[str, Dict[str, str]]]
+# section -> {"added": [...], "removed": [...], "changed": [...]}
+Diff = Dict[str, Dict[str, List[str]]]
+
+
+def digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def json_hash(value: Any) -> str:
+    # Models, lists of models and plain data alike
+    return digest(to_json(value))
+
+
+class ContentHashed(BaseModel):
+    """Model that hashes its serialized content.
+
+    Not cached: nested lists (values, examples) are edited in place and no hook would see it,
+    and pydantic's JSON serializer is cheap next to the rendering and diffing it saves.
+    """
+
+    def content_hash(self) -> str:
+        return json_hash(self)
+
+
+def keyed(pairs: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    # Repeated keys get a "#n" suffix so every item stays addressable
+    result: Dict[str, str] = {}
+    for key, value in pairs:
+        if key in result:
+            n = 2
+            while f"{key}#{n}" in result:
+                n += 1
+            key = f"{key}#{n}"
+        result[key] = value
+    return result
+
+
+def diff_fingerprints(old: Fingerprint, new: Fingerprint) -> Diff:
+    result: Diff = {}
+    for section in old.keys() | new.keys():
+        old_hash, old_items = old.get(section, ("", {}))
+        new_hash, new_items = new.get(section, ("", {}))
+        if old_hash == new_hash:
+            continue  # identical subtree
+        changes = {
+            "added": [k for k in new_items if k not in old_items],
+            "removed": [k for k in old_items if k not in new_items],
+            "changed": [k for k, h in new_items.items() if k in old_items and old_items[k] != h],
+        }
+        if any(changes.values()):
+            result[section] = changes
+    return result
@@ -1,16 +1,99 @@
 # file: tracker.py
-from copy import deepcopy
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, Iterator, Tuple, TypeVar
+from pydantic import BaseModel
 
+T = TypeVar("T")
 
-class Tracked:
-    def __init__(self, obj: T, on_change: Callable[[T, T], None]):
+# Dotted path of every touched field -> its new value, e.g. {"main.memories": [...]}
+ChangeSet = Dict[str, Any]
+
+
+def _get(node: Any, key: str) -> Any:
+    if isinstance(node, dict):
+        return node[key]
+    if isinstance(node, list):
+        return node[int(key)]
+    return getattr(node, key)
+
+
+class Tracked(Generic[T]):
+    """Copy-on-write wrapper: updates copy only the objects on the touched paths.
+
+    The old and new versions passed to on_change share every untouched sub-object.
+    Nested fields are addressed with "__", e.g. update(main__memories=[...]).
+    """
+
+    def __init__(self, obj: T, on_change: Callable[[T, T, ChangeSet], None]):
         self._obj = obj
         self._on_change = on_change
+        self._batch_depth = 0
+        self._batch_start: T = obj
+        self._changes: ChangeSet = {}
+        # Copies made during the current update/batch by id; holding them keeps their ids from being reused
+        self._fresh: Dict[int, Any] = {}
+
+    def _copy(self, node: Any) -> Any:
+        if id(node) in self._fresh:
+            return node
+        if isinstance(node, BaseModel):
+            node = node.model_copy()
+        else:
+            node = node.copy()
+        self._fresh[id(node)] = node
+        return node
+
+    def _set(self, node: Any, path: Tuple[str, ...], value: Any) -> Any:
+        key = path[0]
+        if len(path) > 1:
+            value = self._set(_get(node, key), path[1:], value)
+        node = self._copy(node)
+        if isinstance(node, dict):
+            node[key] = value
+        elif isinstance(node, list):
+            node[int(key)] = value
+        else:
+            setattr(node, key, value)
+        return node
 
     def update(self, **kwargs):
         # Updates fields and triggers on_change with old and new object
-        pass
+        for name, value in kwargs.items():
+            path = tuple(name.split("__"))
+            node = self._obj
+            try:
+                for key in path:
+                    node = _get(node, key)
+                if node is value or node == value:
+                    continue  # nothing actually changes
+            except (AttributeError, KeyError, IndexError, ValueError):
+                pass
+            self._obj = self._set(self._obj, path, value)
+            self._changes[".".join(path)] = value
+        if self._batch_depth == 0:
+            self._emit()
+
+    @contextmanager
+    def batch(self) -> Iterator["Tracked[T]"]:
+        # Several update() calls, one on_change with the combined change set
+        if self._batch_depth == 0:
+            self._batch_start = self._obj
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._emit()
+
+    def _emit(self) -> None:
+        old = self._batch_start
+        changes, self._changes = self._changes, {}
+        self._fresh.clear()
+        self._batch_start = self._obj
+        if changes:
+            self._on_change(old, self._obj, changes)
 
     def get(self) -> T:
         # Returns current state of the object
-        pass
+        return self._obj
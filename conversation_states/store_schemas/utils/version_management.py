@@ -1,14 +1,24 @@
 # file: versioned.py
-from pydantic import BaseModel
-from typing import Generic, TypeVar, List, Callable
+from bisect import bisect_right
+from copy import deepcopy
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Any, Dict, Generic, TypeVar, List, Optional
 from datetime import datetime
 
 T = TypeVar("T")
 
 
+def _as_dict(obj: Any) -> Dict[str, Any]:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return dict(obj)
+
+
 class VersionRecord(BaseModel, Generic[T]):
-    data: T
     timestamp: datetime
+    data: Optional[T] = None  # full snapshot, kept every `snapshot_every` versions
+    delta: Dict[str, Any] = Field(default_factory=dict)  # fields set since the previous version
+    removed: List[str] = Field(default_factory=list)  # fields dropped since the previous version
     changed_by: Optional[str] = None
     comment: Optional[str] = None
 
@@ -16,21 +26,124 @@ class VersionRecord(BaseModel, Generic[T]):
 class VersionedObject(BaseModel, Generic[T]):
     object_id: str
     current: T
-    versions: List[VersionRecord[T]]
+    versions: List[VersionRecord[T]] = Field(default_factory=list)
+    snapshot_every: int = 10
+    max_versions: Optional[int] = None  # older versions are compacted away on add_version
+
+    _timestamps: Optional[List[datetime]] = PrivateAttr(default=None)
+    # Dumped state of the newest version, so edits to `current` in place are still diffed
+    _last_state: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
+    def _times(self) -> List[datetime]:
+        if self._timestamps is None or len(self._timestamps) != len(self.versions):
+            self._timestamps = [v.timestamp for v in self.versions]
+        return self._timestamps
+
+    def _restore(self, state: Dict[str, Any]) -> T:
+        if isinstance(self.current, BaseModel):
+            return type(self.current).model_validate(state)
+        return deepcopy(state)
+
+    def _since_snapshot(self) -> Optional[int]:
+        # Versions recorded after the newest snapshot; None if there is none
+        for distance, record in enumerate(reversed(self.versions)):
+            if record.data is not None:
+                return distance
+        return None
+
+    def _state_at(self, index: int) -> Dict[str, Any]:
+        # Nearest snapshot at or before index, then replay at most snapshot_every deltas
+        start = index
+        while self.versions[start].data is None:
+            start -= 1
+        state = _as_dict(self.versions[start].data)
+        for record in self.versions[start + 1:index + 1]:
+            state.update(record.delta)
+            for key in record.removed:
+                state.pop(key, None)
+        return state
 
-    def add_version(self, new_data: T, changed_by: Optional[str] = None, comment: Optional[str] = None) -> None:
-        # Saves new version to versions list and updates current
-        pass
+    def add_version(
+        self,
+        new_data: T,
+        changed_by: Optional[str] = None,
+        comment: Optional[str] = None,
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        # Saves new version to versions list and updates current; history keeps copies, never new_data itself.
+        # Timestamps must not go back in time: get_at bisects over them
+        times = self._times()
+        if timestamp is None:
+            timestamp = datetime.now()
+            if times and timestamp < times[-1]:
+                timestamp = times[-1]  # the clock stepped back
+        elif times and timestamp < times[-1]:
+            raise ValueError(f"timestamp {timestamp} is earlier than the latest version ({times[-1]})")
+        new_state = deepcopy(_as_dict(new_data))
+        record = VersionRecord[Any](
+            timestamp=timestamp,
+            changed_by=changed_by,
+            comment=comment,
+        )
+        if self.versions:
+            old_state = self._last_state
+            if old_state is None:
+                old_state = self._state_at(len(self.versions) - 1)
+            record.delta = {k: v for k, v in new_state.items()
+                            if k not in old_state or old_state[k] != v}
+            record.removed = [k for k in old_state if k not in new_state]
+        since = self._since_snapshot()
+        if since is None or since + 1 >= self.snapshot_every:
+            record.data = self._restore(new_state)
+        self.versions.append(record)
+        times.append(record.timestamp)
+        self._last_state = new_state
+        self.current = new_data
+        if self.max_versions is not None and len(self.versions) > self.max_versions:
+            self.compact(keep_last=self.max_versions)
 
     def get_latest(self) -> T:
         # Returns the latest version (i.e., current)
-        pass
+        return self.current
 
     def get_at(self, timestamp: datetime) -> Optional[T]:
         # Returns the version active at a given time, if any
-        pass
+        index = bisect_right(self._times(), timestamp) - 1
+        if index < 0:
+            return None
+        return self._restore(self._state_at(index))
 
     def compare_versions(self, index1: int, index2: int) -> dict:
         # Returns field-by-field diff between two saved versions
-        pass
+        n = len(self.versions)
+        index1, index2 = index1 % n, index2 % n
+        lo, hi = sorted((index1, index2))
+        touched = set()
+        for record in self.versions[lo + 1:hi + 1]:
+            touched.update(record.delta)
+            touched.update(record.removed)
+        if not touched:
+            return {}
+        old, new = self._state_at(index1), self._state_at(index2)
+        return {
+            key: {"old": old.get(key), "new": new.get(key)}
+            for key in sorted(touched)
+            if old.get(key) != new.get(key)
+        }
 
+    def compact(self, keep_last: Optional[int] = None, before: Optional[datetime] = None) -> int:
+        # Drops old versions (beyond keep_last, or older than before); the oldest kept one becomes a snapshot
+        cut = 0
+        if keep_last is not None:
+            cut = max(cut, len(self.versions) - keep_last)
+        if before is not None:
+            cut = max(cut, bisect_right(self._times(), before) - 1)
+        cut = min(cut, len(self.versions) - 1)
+        if cut <= 0:
+            return 0
+        first = self.versions[cut]
+        if first.data is None:
+            first.data = self._restore(self._state_at(cut))
+        del self.versions[:cut]
+        self._timestamps = None
+        return cut
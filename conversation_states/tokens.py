@@ -0,0 +1,302 @@
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from . import instrumentation
+from .instrumentation import instrumented
+
+if TYPE_CHECKING:
+    import tiktoken
+
+# Same value as langgraph.graph.message.REMOVE_ALL_MESSAGES; importing langgraph.graph costs ~0.5 s
+REMOVE_ALL_MESSAGES = "__remove_all__"
+
+
+DEFAULT_MODEL = "gpt-4"
+DEFAULT_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: Optional[str] = None, encoding: Optional[str] = None) -> "tiktoken.Encoding":
+    # Loaded once per process for every (model, encoding) pair
+    import tiktoken
+    if encoding is not None:
+        return tiktoken.get_encoding(encoding)
+    return tiktoken.encoding_for_model(model or DEFAULT_MODEL)
+
+
+def prewarm(model: Optional[str] = None, encoding: Optional[str] = None, background: bool = True) -> Optional[Thread]:
+    # Loads tiktoken and the encoder ahead of the first count, by default off the calling thread
+    if not background:
+        get_encoder(model, encoding)
+        return None
+    thread = Thread(target=_prewarm, args=(model, encoding), name="tiktoken-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def _prewarm(model: Optional[str], encoding: Optional[str]) -> None:
+    try:
+        get_encoder(model, encoding)
+    except Exception:
+        pass  # e.g. offline; the first real count reports it
+
+
+def message_text(msg: Any) -> str:
+    if isinstance(msg, str):
+        return msg
+    content = getattr(msg, "content", "")
+    if not isinstance(content, str):
+        content = str(content)
+    return content
+
+
+class TokenCounter:
+    """Counts tokens with a bounded LRU cache keyed by message id + content hash."""
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        encoding: Optional[str] = None,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.model = model
+        self.encoding = encoding
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def encoder(self) -> "tiktoken.Encoding":
+        return get_encoder(self.model, self.encoding)
+
+    @staticmethod
+    def key(msg: Any, text: str) -> Tuple[Optional[str], int, int]:
+        return getattr(msg, "id", None), len(text), hash(text)
+
+    def _lookup(self, key: Hashable) -> Optional[int]:
+        cache = self._cache
+        tokens = cache.get(key)
+        if tokens is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            cache.move_to_end(key)
+        except KeyError:
+            pass
+        return tokens
+
+    def _store(self, key: Hashable, tokens: int) -> None:
+        with self._lock:
+            self._cache[key] = tokens
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def count(self, msg: Any) -> int:
+        text = message_text(msg)
+        if not text:
+            return 0
+        key = self.key(msg, text)
+        tokens = self._lookup(key)
+        if instrumentation.ENABLED:
+            instrumentation.count("token_cache", hits=tokens is not None, misses=tokens is None)
+        if tokens is None:
+            tokens = len(self.encoder.encode(text, disallowed_special=()))
+            self._store(key, tokens)
+        return tokens
+
+    @instrumented("count_many", size=lambda self, messages: len(messages) if hasattr(messages, "__len__") else None)
+    def count_many(self, messages: Iterable[Any]) -> List[int]:
+        # One cache pass, then a single batch encode for all misses
+        counts: List[int] = []
+        missing: Dict[Hashable, List[int]] = {}
+        texts: List[str] = []
+        empty = 0
+        for i, msg in enumerate(messages):
+            text = message_text(msg)
+            if not text:
+                counts.append(0)
+                empty += 1
+                continue
+            key = self.key(msg, text)
+            tokens = self._lookup(key)
+            counts.append(tokens or 0)
+            if tokens is None:
+                if key not in missing:
+                    missing[key] = []
+                    texts.append(text)
+                missing[key].append(i)
+
+        if instrumentation.ENABLED:
+            misses = sum(len(positions) for positions in missing.values())
+            instrumentation.count("token_cache", hits=len(counts) - empty - misses, misses=misses)
+        if texts:
+            encoded = self.encoder.encode_batch(texts, disallowed_special=())
+            for (key, positions), tokens in zip(missing.items(), encoded):
+                self._store(key, len(tokens))
+                for i in positions:
+                    counts[i] = len(tokens)
+        return counts
+
+    def total(self, messages: Iterable[Any]) -> int:
+        return sum(self.count_many(messages))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+_counters: Dict[Tuple[Optional[str], Optional[str]], TokenCounter] = {}
+
+
+def get_counter(model: Optional[str] = None, encoding: Optional[str] = None) -> TokenCounter:
+    key = (model, encoding)
+    counter = _counters.get(key)
+    if counter is None:
+        counter = _counters.setdefault(key, TokenCounter(model, encoding))
+    return counter
+
+
+def count_many(messages: Iterable[Any], model: Optional[str] = None, encoding: Optional[str] = None) -> List[int]:
+    return get_counter(model, encoding).count_many(messages)
+
+
+class TokenLedger:
+    """Running per-message and total token counts for one message field."""
+
+    __slots__ = ("counts", "unkeyed", "total")
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.unkeyed = 0  # tokens of messages without an id
+        self.total = 0
+
+    @classmethod
+    def from_messages(cls, messages: Sequence[Any], counter: Optional[TokenCounter] = None) -> "TokenLedger":
+        ledger = cls()
+        ledger.apply(messages, counter)
+        return ledger
+
+    def copy(self) -> "TokenLedger":
+        ledger = TokenLedger()
+        ledger.counts = self.counts.copy()
+        ledger.unkeyed = self.unkeyed
+        ledger.total = self.total
+        return ledger
+
+    def apply(self, messages: Sequence[Any], counter: Optional[TokenCounter] = None) -> None:
+        # Mirrors add_messages: RemoveMessage drops, a known id replaces, anything else appends
+        if not messages:
+            return
+        from langchain_core.messages import RemoveMessage  # keeps `tokens` importable without langchain
+        tokens = (counter or get_counter()).count_many(
+            [m for m in messages if not isinstance(m, RemoveMessage)])
+        counts = self.counts
+        i = 0
+        for msg in messages:
+            msg_id = getattr(msg, "id", None)
+            if isinstance(msg, RemoveMessage):
+                if msg_id == REMOVE_ALL_MESSAGES:
+                    self.clear()
+                elif msg_id in counts:
+                    self.total -= counts.pop(msg_id)
+                continue
+            n = tokens[i]
+            i += 1
+            if msg_id is None:
+                self.unkeyed += n
+            else:
+                self.total -= counts.get(msg_id, 0)
+                counts[msg_id] = n
+            self.total += n
+
+    def counts_for(self, messages: Sequence[Any], counter: Optional[TokenCounter] = None) -> List[int]:
+        get = self.counts.get
+        values = [get(getattr(m, "id", None)) for m in messages]
+        if None in values:
+            return (counter or get_counter()).count_many(messages)
+        return values
+
+    def get(self, msg_id: str) -> Optional[int]:
+        return self.counts.get(msg_id)
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self.unkeyed = 0
+        self.total = 0
+
+
+class MessageList(list):
+    """A message list that carries its TokenLedger and MessageIndex between graph steps.
+
+    Appends leave cached positions valid; any other in-place change (item assignment, del,
+    insert, pop, remove, sort, ...) bumps `mutations`, which tells cache holders to rebuild.
+    """
+
+    __slots__ = ("ledger", "index", "_size", "mutations")
+
+    def __init__(self, messages: Iterable[Any] = (), ledger: Optional[TokenLedger] = None, index: Any = None):
+        super().__init__(messages)
+        self.ledger = ledger
+        self.index = index
+        self._size = len(self)
+        self.mutations = 0
+
+    def _current(self) -> bool:
+        return self._size == len(self) and not self.mutations
+
+    def current_ledger(self) -> Optional[TokenLedger]:
+        # None once the list was changed in place behind the ledger's back
+        return self.ledger if self._current() else None
+
+    def current_index(self) -> Any:
+        return self.index if self._current() else None
+
+    def current_caches(self) -> Dict[str, Any]:
+        if not self._current():
+            return {}
+        caches = {"ledger": self.ledger, "index": self.index}
+        return {kind: cache for kind, cache in caches.items() if cache is not None}
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.mutations += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.mutations += 1
+
+    def __imul__(self, n):
+        self.mutations += 1
+        return super().__imul__(n)
+
+    def insert(self, pos, value):
+        super().insert(pos, value)
+        self.mutations += 1
+
+    def pop(self, pos=-1):
+        self.mutations += 1
+        return super().pop(pos)
+
+    def remove(self, value):
+        super().remove(value)
+        self.mutations += 1
+
+    def clear(self):
+        super().clear()
+        self.mutations += 1
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.mutations += 1
+
+    def reverse(self):
+        super().reverse()
+        self.mutations += 1
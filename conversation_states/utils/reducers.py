@@ -1,7 +1,13 @@
+import uuid
 from typing import Optional, Union, Any
-from conversation_states.humans import Human
+from langchain_core.messages import convert_to_messages
+from conversation_states.humans import Human, UserRegistry
+from conversation_states.instrumentation import instrumented
+from conversation_states.messages import MessageIndex
+from conversation_states.tokens import MessageList, TokenLedger
 
 
+@instrumented("reducers.add_summary")
 def add_summary(a: Optional[str], b: Optional[str]) -> Optional[str]:
     if a is None and b is None:
         return None
@@ -13,14 +19,44 @@ def add_summary(a: Optional[str], b: Optional[str]) -> Optional[str]:
     return b
 
 
-def add_user(left: list["Human"], right: list["Human"]) -> list["Human"]:
-    right = [u if isinstance(u, Human) else Human(**u)
-             for u in right or []]
+@instrumented("reducers.add_user", size=lambda left, right: len(right or ()))
+def add_user(left: list["Human"], right: list["Human"]) -> UserRegistry:
+    # Upserts into a copy of the registry: new users are added, known ones get their updates merged
+    if right is left:
+        return left
+    registry = left.copy() if isinstance(left, UserRegistry) else UserRegistry(left or [])
+    registry.upsert_many(right or [])
+    return registry
 
-    existing_ids = {u.username for u in left}
-    return left + [u for u in right if u.username not in existing_ids]
 
+@instrumented("reducers.add_messages", size=lambda left, right: len(right) if isinstance(right, list) else 1)
+def add_counted_messages(left: list, right: list) -> MessageList:
+    # add_messages that also keeps the TokenLedger and MessageIndex of the merged list up to date
+    from langgraph.graph.message import add_messages  # heavy, loaded on the first merge
+    if not isinstance(right, list):
+        right = [right]
+    right = convert_to_messages(right)
+    for m in right:
+        if m.id is None:
+            m.id = str(uuid.uuid4())
 
+    merged = add_messages(left, right)
+
+    ledger = left.current_ledger() if isinstance(left, MessageList) else None
+    ledger = ledger.copy() if ledger is not None else TokenLedger.from_messages(left)
+    ledger.apply(right)
+
+    # Pure appends extend the index; removals and replacements shift positions, so rebuild
+    index = left.current_index() if isinstance(left, MessageList) else None
+    if index is not None and len(merged) == len(left) + len(right):
+        index = index.copy()
+        index.extend(right)
+    else:
+        index = MessageIndex.build(merged)
+    return MessageList(merged, ledger, index)
+
+
+@instrumented("reducers.manage_state")
 def manage_state(
     a: Optional[Union["InternalState", list[Any]]],
     b: Optional[Union["InternalState", list[Any]]]
@@ -0,0 +1,26 @@
+import pytest
+from langgraph.graph import END, START, StateGraph
+from benchmarks.suite import ensure_encoder
+
+# Offline runs get the benchmarks' byte-level stand-in for cl100k_base
+ensure_encoder()
+
+
+@pytest.fixture
+def run_graph():
+    # Chains the steps as nodes of a real StateGraph; returns the state each step was given
+    def run(state_cls, *steps, **inputs):
+        seen = []
+        graph = StateGraph(state_cls)
+        previous = START
+        for n, step in enumerate(steps):
+            def node(state, step=step):
+                seen.append(state)
+                return step(state) or {}
+            graph.add_node(f"step{n}", node)
+            graph.add_edge(previous, f"step{n}")
+            previous = f"step{n}"
+        graph.add_edge(previous, END)
+        graph.compile().invoke(inputs)
+        return seen
+    return run
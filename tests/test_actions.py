@@ -0,0 +1,66 @@
+import asyncio
+from conversation_states.actions import Action, ActionSender
+
+
+def make_sender(**kwargs):
+    chunks = []
+    return ActionSender(chunks.append, **kwargs), chunks
+
+
+def values(chunks):
+    return [[action["value"] for action in chunk["actions"]] for chunk in chunks]
+
+
+def test_unbuffered_sends_each_action():
+    sender, chunks = make_sender()
+    sender.send_reaction("👍")
+    sender.send_action(Action(type="gif", value="cat.gif"))
+    assert values(chunks) == [["👍"], ["cat.gif"]]
+
+
+def test_context_batches_coalesces_reactions_and_restores_mode():
+    sender, chunks = make_sender(max_delay=60)
+    with sender:
+        sender.send_reaction("👍")
+        sender.send_reaction("👍")
+        sender.send_action(Action(type="voice", value="hi.ogg"))
+        assert chunks == []
+    assert values(chunks) == [["👍", "hi.ogg"]]
+    assert not sender.buffered
+    sender.send_reaction("🔥")
+    assert values(chunks)[-1] == ["🔥"]
+
+
+def test_nested_contexts_and_buffered_senders_keep_their_mode():
+    sender, chunks = make_sender(buffered=True, max_delay=60)
+    with sender:
+        with sender:
+            sender.send_reaction("👍")
+        assert values(chunks) == [["👍"]]
+    assert sender.buffered
+    sender.send_reaction("🔥")
+    assert len(chunks) == 1
+    sender.flush()
+    assert values(chunks)[-1] == ["🔥"]
+
+
+def test_max_batch_flushes_early():
+    sender, chunks = make_sender(buffered=True, max_batch=2, max_delay=60)
+    for value in ("a.gif", "b.gif", "c.gif"):
+        sender.send_action(Action(type="gif", value=value))
+    assert values(chunks) == [["a.gif", "b.gif"]]
+
+
+def test_async_window_closes_on_its_own():
+    async def main():
+        sender, chunks = make_sender(buffered=True, max_delay=0.01)
+        sender.send_reaction("👍")
+        await asyncio.sleep(0.05)
+        flushed = values(chunks)
+        async with sender:
+            sender.send_reaction("🎉")
+        return flushed, values(chunks), sender.buffered
+
+    flushed, chunks, buffered = asyncio.run(main())
+    assert flushed == [["👍"]]
+    assert chunks == [["👍"], ["🎉"]] and buffered
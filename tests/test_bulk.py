@@ -0,0 +1,63 @@
+import json
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from conversation_states.bulk import BulkError, load_state, map_states, rehydrate, state_stats, token_report
+from conversation_states.serialization import dumps
+from conversation_states.states import ExternalState, InternalState
+from conversation_states.tokens import TokenLedger
+
+
+def thread(n):
+    return ExternalState(
+        messages=[HumanMessage(content=f"question {n}", id=f"h{n}", name="alice"),
+                  AIMessage(content="", id=f"a{n}", tool_calls=[{"name": "f", "args": {}, "id": f"c{n}"}])],
+        users=[{"username": "alice", "first_name": "Alice"}],
+        summary="x" * n,
+    )
+
+
+def sources(count):
+    # Every supported form: dict, JSON str, JSON bytes, binary checkpoint
+    states = [thread(n) for n in range(count)]
+    forms = [lambda s: s.model_dump(), lambda s: s.model_dump_json(),
+             lambda s: s.model_dump_json().encode(), dumps]
+    return states, [forms[n % 4](s) for n, s in enumerate(states)]
+
+
+def test_load_state_accepts_every_source_form():
+    states, blobs = sources(4)
+    for state, blob in zip(states, blobs):
+        assert load_state(blob).model_dump() == state.model_dump()
+    internal = InternalState.from_external(states[0])
+    assert type(load_state(json.loads(internal.model_dump_json()), kind="internal")) is InternalState
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rehydrate_keeps_order_and_ready_ledgers(workers):
+    states, blobs = sources(10)
+    restored = list(rehydrate(blobs, workers=workers, chunk_size=3))
+    assert [s.summary for s in restored] == [s.summary for s in states]
+    for state in restored:
+        assert state.token_ledger("messages").total == TokenLedger.from_messages(state.messages).total
+
+
+def test_token_report_sums_state_stats():
+    states, blobs = sources(6)
+    report = token_report(blobs, workers=2, chunk_size=2, ordered=False)
+    assert report["states"] == 6 and report["users"] == 6
+    assert report["messages.messages"] == 12 and report["messages.tool_calls"] == 6
+    assert report["summary_chars"] == sum(range(6))
+    assert report["messages.tokens"] == sum(state_stats(s)["messages.tokens"] for s in states)
+
+
+def test_bad_sources_raise_skip_or_return():
+    _, blobs = sources(5)
+    blobs[2] = "{not json"
+    with pytest.raises(BulkError) as raised:
+        list(map_states(state_stats, blobs, workers=1))
+    assert raised.value.index == 2
+    assert [i for i, _ in map_states(state_stats, blobs, workers=2, chunk_size=2, errors="skip")] == [0, 1, 3, 4]
+    returned = dict(map_states(state_stats, blobs, workers=1, errors="return"))
+    assert isinstance(returned[2], BulkError) and returned[4]["states"] == 1
+    with pytest.raises(ValueError):
+        list(map_states(state_stats, blobs, kind="other"))
@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from conversation_states.compaction import Compactor, safe_cut, stub_summarizer
+from conversation_states.states import ExternalState
+from conversation_states.tokens import TokenLedger
+
+
+def tool_turn(n: int, calls: int = 2) -> list:
+    ids = [f"call{n}_{i}" for i in range(calls)]
+    return [
+        HumanMessage(content=f"question {n} " * 5, id=f"h{n}", name="alice"),
+        AIMessage(content="", id=f"a{n}", tool_calls=[
+            {"name": "search", "args": {"q": str(n)}, "id": call_id} for call_id in ids]),
+        *[ToolMessage(content=f"result {call_id} " * 5, tool_call_id=call_id, id=f"t{call_id}") for call_id in ids],
+        AIMessage(content=f"answer {n} " * 5, id=f"r{n}"),
+    ]
+
+
+def pending_after(messages: list) -> set:
+    pending = set()
+    for msg in messages:
+        if msg.type == "ai":
+            pending.update(call["id"] for call in msg.tool_calls)
+        elif msg.type == "tool":
+            pending.discard(msg.tool_call_id)
+    return pending
+
+
+def test_safe_cut_never_splits_a_tool_call_from_its_results():
+    messages = tool_turn(0)  # human, ai(2 calls), tool, tool, ai
+    assert safe_cut(messages, 1, len(messages)) == 1
+    for target in (2, 3, 4):
+        assert safe_cut(messages, target, len(messages)) == 4
+    assert safe_cut(messages, 5, len(messages)) == 5
+
+
+def test_safe_cut_falls_back_below_target_when_limit_is_inside_a_tool_call():
+    messages = tool_turn(0)
+    assert safe_cut(messages, 3, 3) == 1
+    assert safe_cut(messages, 0, 0) == 0
+
+
+def test_safe_cut_reads_openai_style_tool_calls():
+    messages = [
+        HumanMessage(content="hi", id="h"),
+        AIMessage(content="", id="a", additional_kwargs={"tool_calls": [
+            {"id": "c1", "type": "function", "function": {"name": "f", "arguments": "{}"}}]}),
+        ToolMessage(content="done", tool_call_id="c1", id="t"),
+        AIMessage(content="ok", id="r"),
+    ]
+    assert safe_cut(messages, 2, len(messages)) == 3
+
+
+def make_state(turns: int, system: bool = True) -> ExternalState:
+    messages = [SystemMessage(content="be nice", id="sys")] if system else []
+    for n in range(turns):
+        messages.extend(tool_turn(n))
+    return ExternalState(messages=messages)
+
+
+def test_select_is_empty_under_the_threshold():
+    state = make_state(3)
+    total = state.messages_api.total_tokens
+    assert Compactor(max_tokens=total, keep_tokens=total // 2).select(state) == []
+
+
+def test_select_keeps_system_prompt_tail_and_tool_pairs():
+    state = make_state(10)
+    total = state.messages_api.total_tokens
+    compactor = Compactor(max_tokens=total // 2, keep_tokens=total // 4, keep_last=4)
+    old = compactor.select(state)
+
+    assert old
+    items = state.messages
+    assert old == items[1:1 + len(old)]  # oldest first, right after the system prompt
+    assert all(msg.type != "system" for msg in old)
+    assert len(items) - (1 + len(old)) >= 4
+    assert pending_after(old) == set()
+
+    # The cut lands at or past the token target, so what stays fits keep_tokens
+    assert TokenLedger.from_messages(items[1 + len(old):]).total <= compactor.keep_tokens
+
+
+def test_compact_returns_summary_and_removals_that_fit_the_budget():
+    state = make_state(10)
+    total = state.messages_api.total_tokens
+    compactor = Compactor(max_tokens=total // 2, keep_tokens=total // 4)
+    update = compactor(state)
+
+    assert update["summary"]
+    removed = update["messages"]
+    assert all(isinstance(msg, RemoveMessage) for msg in removed)
+    gone = {msg.id for msg in removed}
+    assert "sys" not in gone
+    remaining = [msg for msg in state.messages if msg.id not in gone]
+    assert TokenLedger.from_messages(remaining).total <= compactor.max_tokens
+    assert pending_after(remaining) == set()
+
+
+def test_compact_rejects_async_summarizer_and_acompact_awaits_it():
+    async def summarize(previous, messages):
+        return f"{len(messages)} messages"
+
+    state = make_state(10)
+    total = state.messages_api.total_tokens
+    compactor = Compactor(summarize, max_tokens=total // 2, keep_tokens=total // 4)
+    with pytest.raises(TypeError):
+        compactor.compact(state)
+    update = asyncio.run(compactor.acompact(state))
+    assert update["summary"] == f"{len(update['messages'])} messages"
+
+
+def test_stub_summarizer_keeps_previous_summary_and_drops_whole_lines():
+    messages = tool_turn(0)
+    summary = stub_summarizer("earlier", messages)
+    assert summary.splitlines()[0] == "earlier"
+    short = stub_summarizer("earlier", messages, max_chars=60)
+    assert len(short) <= 60
+    assert all(line in summary.splitlines() for line in short.splitlines())
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+from conversation_states.humans import Human
+from conversation_states.store_schemas.human_profile import HumanProfile, TemporaryStateItem, sweep_expired
+
+NOW = datetime(2026, 1, 1, 12)
+
+
+def intent(value, hours=None):
+    until = NOW + timedelta(hours=hours) if hours is not None else None
+    return TemporaryStateItem(value=[value], recorded_at=NOW - timedelta(days=1), relevant_until=until)
+
+
+def profile(*intents):
+    return HumanProfile(thread_id=uuid4(), user=Human(username="alice", first_name="Alice"),
+                        temporary_intents=list(intents))
+
+
+def values(intents):
+    return [i.value[0] for i in intents]
+
+
+def test_active_intents_and_expiry():
+    p = profile(intent("keep", 1), intent("old", -1), intent("forever"), intent("soon", 0.5))
+    assert values(p.active_intents(at=NOW)) == ["keep", "forever", "soon"]
+    assert p.next_expiry() == NOW - timedelta(hours=1)
+    assert p.drop_expired(at=NOW) == 1
+    assert values(p.temporary_intents) == ["keep", "forever", "soon"]
+    assert values(p.active_intents(at=NOW + timedelta(hours=2))) == ["forever"]
+    assert "soon" not in p.to_prompt(at=NOW + timedelta(hours=0.75)) and "keep" in p.to_prompt(at=NOW)
+
+
+def test_in_place_replacement_is_not_dropped():
+    p = profile(intent("keep", 1), intent("old", -1))
+    assert values(p.active_intents(at=NOW)) == ["keep"]
+    p.temporary_intents[1] = intent("new", 10)
+    assert p.drop_expired(at=NOW) == 0
+    assert values(p.temporary_intents) == ["keep", "new"]
+    assert values(p.active_intents(at=NOW)) == ["keep", "new"]
+
+
+def test_in_place_edit_of_relevant_until_is_seen():
+    p = profile(intent("keep", 1), intent("later", 5))
+    assert sweep_expired([p], at=NOW) == 0
+    p.temporary_intents[0].relevant_until = NOW - timedelta(minutes=1)
+    assert values(p.active_intents(at=NOW)) == ["later"]
+    assert sweep_expired([p, profile()], at=NOW) == 1
+    assert values(p.temporary_intents) == ["later"]
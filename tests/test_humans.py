@@ -0,0 +1,73 @@
+import pickle
+from conversation_states.humans import Human, UserRegistry
+from conversation_states.states import ExternalState
+from conversation_states.utils.reducers import add_user
+
+
+def registry():
+    return UserRegistry([Human(username="alice", first_name="Alice"), {"username": "bob", "first_name": "Bob"}])
+
+
+def test_upsert_merges_into_a_new_entry():
+    users = registry()
+    alice = users.get("alice")
+    merged = users.upsert(Human(username="alice", first_name="Alice", last_name="Smith",
+                                information={"city": "Paris"}))
+    assert merged is users.get("alice") and merged is not alice
+    assert (merged.last_name, merged.information) == ("Smith", {"city": "Paris"})
+    assert alice.last_name is None and alice.information == {}
+    users.upsert({"username": "alice", "first_name": "Alice", "information": {"city": ""}})
+    assert users.get("alice").information == {}
+    users += [Human(username="alice", first_name="Al")]
+    assert len(users) == 2 and users.get("alice").first_name == "Al"
+
+
+def test_lookups_after_direct_list_edits():
+    users = registry()
+    users[0] = Human(username="zoe", first_name="Zoe")
+    assert users.get("zoe").first_name == "Zoe"
+    assert users.get("alice") is None and "alice" not in users
+    users.pop(0)
+    assert users.get("bob").first_name == "Bob"
+    users.insert(0, Human(username="carol", first_name="Carol"))
+    users.sort(key=lambda u: u.username, reverse=True)
+    assert [u.username for u in users] == ["carol", "bob"]
+    assert users.get("bob") is users[1]
+    del users[1]
+    assert users.get("bob") is None
+    users.clear()
+    users.upsert({"username": "bob", "first_name": "Robert"})
+    assert len(users) == 1 and users.get("bob").first_name == "Robert"
+
+
+def test_copy_and_pickle_keep_the_index():
+    users = registry()
+    copy = users.copy()
+    copy.upsert({"username": "dave", "first_name": "Dave"})
+    assert "dave" in copy and "dave" not in users
+    restored = pickle.loads(pickle.dumps(users))
+    assert isinstance(restored, UserRegistry) and restored.get("bob") == users.get("bob")
+
+
+def test_add_user_reducer_leaves_the_previous_registry_alone():
+    left = registry()
+    merged = add_user(left, [{"username": "alice", "first_name": "Alice", "information": {"k": "v"}},
+                             {"username": "eve", "first_name": "Eve"}])
+    assert [u.username for u in merged] == ["alice", "bob", "eve"]
+    assert merged.get("alice").information == {"k": "v"}
+    assert left.get("alice").information == {} and "eve" not in left
+
+
+def test_users_field_through_a_graph(run_graph):
+    seen = run_graph(
+        ExternalState,
+        lambda s: {"users": [{"username": "bob", "first_name": "Bob"}]},
+        lambda s: {"users": [{"username": "alice", "first_name": "Alice", "preferred_name": "Ali"}]},
+        lambda s: None,
+        users=[{"username": "alice", "first_name": "Alice"}],
+    )
+    final = seen[-1].users
+    assert isinstance(final, UserRegistry)
+    assert [u.username for u in final] == ["alice", "bob"]
+    assert final.get("alice").preferred_name == "Ali"
+    assert seen[0].users.get("alice").preferred_name is None
@@ -0,0 +1,53 @@
+from langchain_core.messages import HumanMessage
+from conversation_states.store_schemas.instruction import (
+    ExampleItem, InstructionItem, InstructionList, instruction_line, select_instructions)
+from conversation_states.tokens import get_counter
+
+
+def item(key, weight=5, condition="", **kwargs):
+    return InstructionItem(key=key, value=f"{key} value", weight=weight, condition=condition, **kwargs)
+
+
+def keys(items):
+    return [i.item.key if hasattr(i, "item") else i.key for i in items]
+
+
+def test_relevant_matches_condition_keywords_not_stopwords():
+    il = InstructionList(items=[
+        item("always", 3),
+        item("exams", 8, condition="only if the user talks about exams"),
+        item("travel", 6, condition="when the user asks about a trip",
+             examples=[ExampleItem(input="flight to Rome", output="[checks dates]")]),
+    ])
+    assert keys(il.relevant("Any tips for my exams?")) == ["exams", "always"]
+    assert keys(il.relevant(HumanMessage(content="booked a flight"))) == ["travel", "always"]
+    # Words every condition uses match nothing
+    assert keys(il.relevant("the user only asks about it")) == ["always"]
+
+
+def test_index_follows_in_place_edits():
+    il = InstructionList(items=[item("a", 1), item("c", 9)])
+    assert il.get("a").key == "a"
+    il.items[0] = item("b", 5, condition="if weather comes up")
+    assert il.get("a") is None and il.get("b").key == "b"
+    assert keys(il.by_weight()) == ["c", "b"]
+    assert keys(il.relevant("what's the weather")) == ["c", "b"]
+    il.items[1].weight = 0
+    il.items[1].condition = "weather"
+    assert keys(il.select("nice weather")) == ["b", "c"]
+    assert keys(il.select("hello")) == []
+
+
+def test_select_respects_budget_limit_and_thread_overrides():
+    thread = InstructionList(items=[item("tone", 5), item("short", 9)])
+    global_ = InstructionList(items=[item("tone", 10), item("emoji", 7),
+                                     item("long", 1, examples=[ExampleItem(input="x " * 50, output="y")])])
+    chosen = select_instructions("hi", thread, global_)
+    assert keys(chosen) == ["short", "emoji", "tone", "long"]
+    assert chosen[2].item is thread.items[0]
+    assert keys(select_instructions("hi", thread, global_, limit=2)) == ["short", "emoji"]
+    counter = get_counter()
+    budget = counter.count(instruction_line(thread.items[1])) + counter.count(instruction_line(global_.items[1])) + 2
+    tight = select_instructions("hi", thread, global_, max_tokens=budget)
+    assert keys(tight) == ["short", "emoji"]
+    assert sum(counter.count(line) + 1 for s in tight for line in s.lines()) <= budget
@@ -0,0 +1,49 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from conversation_states.message_store import CompactMessageStore
+from conversation_states.messages import MessageIndex
+from conversation_states.tokens import TokenLedger
+
+
+def history():
+    return [
+        HumanMessage(content="hi", id="h1", name="alice"),
+        AIMessage(content="", id="a1", tool_calls=[{"name": "f", "args": {"x": 1}, "id": "c1"}]),
+        ToolMessage(content="done", tool_call_id="c1", id="t1", artifact={"rows": 3}),
+        AIMessage(content="all done", id="a2", response_metadata={"model": "m"}),
+    ]
+
+
+def test_messages_round_trip():
+    messages = history()
+    store = CompactMessageStore(messages, materialized_cache=1)
+    assert store.to_messages() == messages
+    assert store[-1] == messages[-1] and store[1:3] == messages[1:3]
+
+
+def test_add_messages_semantics_and_sidecars():
+    store = CompactMessageStore(history())
+    ledger, index = store.token_ledger(), store.message_index()
+    store.apply([AIMessage(content="replaced", id="a1"), RemoveMessage(id="t1"),
+                 HumanMessage(content="again", id="h2", name="alice")])
+    assert [m.id for m in store] == ["h1", "a1", "a2", "h2"]
+    assert store[1].content == "replaced" and not store[1].tool_calls
+    assert store.token_ledger().total == TokenLedger.from_messages(store.to_messages()).total
+    assert store.message_index().by_id == MessageIndex.build(store.to_messages()).by_id
+    assert store.token_ledger() is not ledger and store.message_index() is not index
+    # Appends extend the sidecars in place
+    ledger = store.token_ledger()
+    store.append(AIMessage(content="bye", id="a3"))
+    assert store.token_ledger() is ledger
+    assert store.messages_api.last(name="alice", count="all")[-1].id == "h2"
+    assert store.messages_api.get("a3").content == "bye"
+
+
+def test_spill_file_starts_empty(tmp_path):
+    path = str(tmp_path / "extras")
+    with CompactMessageStore([AIMessage(content="x", id="old", additional_kwargs={"secret": "old"})],
+                             spill_path=path):
+        pass
+    with CompactMessageStore([AIMessage(content="y", id="new")], spill_path=path) as store:
+        assert store[0].additional_kwargs == {}
+        store.append(ToolMessage(content="z", tool_call_id="c", id="t", artifact=[1]))
+        assert store[1].artifact == [1]
@@ -0,0 +1,138 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from conversation_states.humans import Human
+from conversation_states.messages import MessageIndex, trim_window
+from conversation_states.states import ExternalState
+
+
+def ids(messages):
+    return [m.id for m in messages]
+
+
+def dialog(n):
+    return [(HumanMessage if i % 2 == 0 else AIMessage)(content=f"message {i}", id=f"m{i}") for i in range(n)]
+
+
+def test_trim_window_takes_head_and_tail_by_tokens():
+    messages = dialog(7)
+    assert ids(trim_window(messages, [10] * 7, first_tokens=25, last_tokens=30)) == \
+        ["m0", "m1", "m4", "m5", "m6"]
+
+
+def test_trim_window_head_ends_on_ai_and_tail_starts_on_human():
+    messages = dialog(7)
+    # 35 tokens would end the head on a human message, 40 would start the tail on an ai one
+    assert ids(trim_window(messages, [10] * 7, first_tokens=35, last_tokens=40)) == \
+        ["m0", "m1", "m4", "m5", "m6"]
+
+
+def test_trim_window_tail_never_overlaps_the_head():
+    messages = dialog(7)
+    window = trim_window(messages, [10] * 7, first_tokens=60, last_tokens=30)
+    assert ids(window) == ids(messages)
+
+
+def test_trim_window_keeps_system_and_marks_the_gap():
+    messages = [SystemMessage(content="rules", id="s")] + dialog(5)
+    window = trim_window(messages, [5] + [10] * 5, first_tokens=0, last_tokens=25, gap_marker="...")
+    assert ids(window[:1]) == ["s"]
+    assert isinstance(window[1], SystemMessage) and window[1].content == "..."
+    assert ids(window[2:]) == ["m4"]
+    # Nothing omitted, no marker
+    full = trim_window(messages, [5] + [10] * 5, first_tokens=0, last_tokens=100, gap_marker="...")
+    assert ids(full) == ids(messages)
+
+
+def test_trim_window_tail_ends_on_human_or_tool():
+    messages = dialog(4) + [
+        AIMessage(content="", id="call", tool_calls=[{"name": "f", "args": {}, "id": "c1"}]),
+        ToolMessage(content="done", tool_call_id="c1", id="t1"),
+        AIMessage(content="final", id="last"),
+    ]
+    window = trim_window(messages, [10] * 7, first_tokens=0, last_tokens=1000)
+    assert ids(window) == ["m0", "m1", "m2", "m3", "call", "t1"]
+
+
+def test_message_api_trim_uses_the_ledger_counts():
+    state = ExternalState(messages=dialog(9))
+    items = state.messages
+    counts = state.token_ledger("messages").counts_for(items)
+    first, last = counts[0] + counts[1], sum(counts[-3:])
+    assert ids(state.messages_api.trim(first_tokens=first, last_tokens=last)) == \
+        ids(trim_window(items, counts, first, last))
+    assert ids(state.messages_api.trim(first_tokens=first, last_tokens=last)) == ["m0", "m1", "m6", "m7", "m8"]
+    assert trim_window([], [], 10, 10) == []
+
+
+def assert_index_matches(state):
+    items = state.messages
+    index = state.message_index("messages")
+    built = MessageIndex.build(items)
+    for pos, msg in enumerate(items):
+        assert index.position(msg.id) == built.position(msg.id) == pos
+    for role in ("human", "ai", "tool"):
+        assert index.last_positions(role, None, "all") == built.last_positions(role, None, "all")
+    assert index.by_name == built.by_name
+
+
+def test_index_follows_appends_replacements_and_removals(run_graph):
+    seen = run_graph(
+        ExternalState,
+        lambda s: {"messages": [AIMessage(content="hi alice", id="a1")]},
+        lambda s: {"messages": [
+            HumanMessage(content="weather in Paris?", id="h2", name="bob"),
+            AIMessage(content="", id="a2", tool_calls=[{"name": "weather", "args": {}, "id": "c1"}]),
+            ToolMessage(content="sunny, 24C", tool_call_id="c1", id="t1"),
+        ]},
+        lambda s: {"messages": [AIMessage(content="a much longer greeting for alice", id="a1")]},
+        lambda s: {"messages": [RemoveMessage(id="h2")]},
+        lambda s: None,
+        messages=[HumanMessage(content="hello there", id="h1", name="alice")],
+    )
+    assert [ids(s.messages) for s in seen] == [
+        ["h1"],
+        ["h1", "a1"],
+        ["h1", "a1", "h2", "a2", "t1"],
+        ["h1", "a1", "h2", "a2", "t1"],
+        ["h1", "a1", "a2", "t1"],
+    ]
+    for state in seen:
+        assert_index_matches(state)
+    api = seen[-1].messages_api
+    assert api.get("a1").content == "a much longer greeting for alice"
+    assert api.get("h2") is None
+    assert ids(api.last(role="ai", count="all")) == ["a1", "a2"]
+    assert ids(api.last(role="tool", name="alice", count="all")) == ["h1", "t1"]
+    assert ids(api.last(name="alice")) == ["h1"]
+
+
+def test_in_place_edits_inside_a_node_are_seen_by_the_caches(run_graph):
+    def replace_in_place(state):
+        before = state.messages_api.total_tokens
+        state.messages[1] = HumanMessage(content="now a human message " * 10, id="x", name="carol")
+        assert state.messages_api.total_tokens > before
+        assert state.messages_api.last(role="ai") == []
+        assert state.messages_api.get("a1") is None
+        assert state.messages_api.get("x").name == "carol"
+        assert_index_matches(state)
+        del state.messages[0]
+        assert state.messages_api.get("x") is state.messages[0]
+        assert_index_matches(state)
+
+    run_graph(
+        ExternalState,
+        lambda s: {"messages": [AIMessage(content="short", id="a1")]},
+        replace_in_place,
+        messages=[HumanMessage(content="hi", id="h1")],
+    )
+
+
+def test_sender_uses_the_last_human_message():
+    state = ExternalState(
+        messages=[HumanMessage(content="hi", id="h1", name="alice"), AIMessage(content="hey", id="a1"),
+                  HumanMessage(content="me too", id="h2", name="bob")],
+        users=[Human(username="alice", first_name="Alice"), Human(username="bob", first_name="Bob")],
+    )
+    assert state.messages_api.sender(state.users).first_name == "Bob"
+    assert state.messages_api.sender([Human(username="bob", first_name="B")]).first_name == "B"
+    state.messages.append(HumanMessage(content="anon", id="h3"))
+    assert state.messages_api.sender(state.users) is None
@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime
+from uuid import uuid4
+import pytest
+from langgraph.store.base import PutOp
+from langgraph.store.memory import InMemoryStore
+from conversation_states.humans import Human
+from conversation_states.store_schemas.human_profile import HumanProfile, MemoryItem
+from conversation_states.store_schemas.repository import ModelCache, StoreRepository
+from conversation_states.store_schemas.schedule import ScheduleList
+from conversation_states.store_schemas.task import ActionItem, ApproximateDateTime, Task, TaskList
+
+
+class RecordingStore(InMemoryStore):
+    # Every batch call and the ops in it
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def batch(self, ops):
+        ops = list(ops)
+        self.calls.append(ops)
+        return super().batch(ops)
+
+    async def abatch(self, ops):
+        ops = list(ops)
+        self.calls.append(ops)
+        return await super().abatch(ops)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+THREAD = uuid4()
+
+
+def profile(username):
+    return HumanProfile(thread_id=THREAD, user=Human(username=username, first_name=username.title()))
+
+
+def tasks():
+    return TaskList(thread_id=str(THREAD), tasks=[Task(
+        time=ApproximateDateTime(target=datetime(2026, 1, 1)), requested_by=None, reply_to=None,
+        action=ActionItem(type="remind", instruction="ping"))])
+
+
+def put_fields(ops):
+    return sorted(op.key for op in ops if isinstance(op, PutOp) and op.key != "__meta__")
+
+
+@pytest.fixture
+def setup():
+    store, clock = RecordingStore(), Clock()
+    return store, clock, StoreRepository(store, prefix=("app",), cache=ModelCache(ttl=60, clock=clock))
+
+
+def test_save_and_load_many_are_one_batch_each(setup):
+    store, clock, repo = setup
+    models = [profile("alice"), profile("bob"), tasks(), ScheduleList(thread_id=THREAD, schedules=[])]
+    assert repo.save_many(models) == 4
+    assert len(store.calls) == 1
+
+    fresh = StoreRepository(store, prefix=("app",))
+    loaded = fresh.load_many([(HumanProfile, THREAD, "alice"), (HumanProfile, THREAD, "bob"),
+                              (TaskList, THREAD, "tasks"), (ScheduleList, THREAD, "schedules"),
+                              (HumanProfile, THREAD, "nobody")])
+    assert len(store.calls) == 2 and fresh.round_trips == 1
+    assert [m.model_dump() for m in loaded[:4]] == [m.model_dump() for m in models]
+    assert loaded[4] is None
+    # Cached now: no store access at all
+    assert fresh.profiles(THREAD, ["alice", "bob"])["bob"] is loaded[1]
+    assert len(store.calls) == 2
+
+
+def test_only_changed_fields_are_written(setup):
+    store, clock, repo = setup
+    alice = profile("alice")
+    repo.save(alice)
+    assert repo.save(alice) == 0 and len(store.calls) == 1
+    alice.main.memories.append(MemoryItem(key="city", value=["Paris"]))  # nested, in place
+    assert repo.save(alice) == 1
+    assert put_fields(store.calls[-1]) == ["main"]
+    alice.main.memories[0].value.append("Lyon")
+    alice.user.update_info({"job": "pilot"})
+    repo.save(alice)
+    assert put_fields(store.calls[-1]) == ["main", "user"]
+    loaded = StoreRepository(store, prefix=("app",)).load(HumanProfile, THREAD, "alice")
+    assert loaded.main.memories[0].value == ["Paris", "Lyon"]
+    assert loaded.user.information == {"job": "pilot"}
+
+
+def test_cache_expires_after_ttl(setup):
+    store, clock, repo = setup
+    repo.save(profile("alice"))
+    calls = len(store.calls)
+    first = repo.load(HumanProfile, THREAD, "alice")
+    assert len(store.calls) == calls
+    clock.now += 61
+    again = repo.load(HumanProfile, THREAD, "alice")
+    assert len(store.calls) == calls + 1
+    assert again.model_dump() == first.model_dump()
+
+
+def test_revalidate_picks_up_a_version_bump(setup):
+    store, clock, repo = setup
+    repo.save(profile("alice"), profile("bob"))
+    alice, bob = repo.load_many([(HumanProfile, THREAD, "alice"), (HumanProfile, THREAD, "bob")])
+
+    other = StoreRepository(store, prefix=("app",))
+    remote = other.load(HumanProfile, THREAD, "alice")
+    remote.preferences.memories.append(MemoryItem(key="tone", value=["formal"]))
+    other.save(remote)
+
+    # Without revalidation the cached copy is served; with it only the bumped model is rebuilt
+    assert repo.load(HumanProfile, THREAD, "alice") is alice
+    calls = len(store.calls)
+    new_alice, same_bob = repo.load_many([(HumanProfile, THREAD, "alice"), (HumanProfile, THREAD, "bob")],
+                                         revalidate=True)
+    assert len(store.calls) == calls + 1
+    assert same_bob is bob and new_alice is not alice
+    assert new_alice.preferences.memories[0].value == ["formal"]
+
+
+def test_async_paths_and_delete(setup):
+    store, clock, repo = setup
+
+    async def main():
+        await repo.asave_many([profile("alice")])
+        repo.invalidate()
+        [loaded] = await repo.aload_many([(HumanProfile, THREAD, "alice")])
+        return loaded
+
+    assert asyncio.run(main()).user.username == "alice"
+    repo.delete(repo.load(HumanProfile, THREAD, "alice"))
+    assert repo.load(HumanProfile, THREAD, "alice") is None
+    assert StoreRepository(store, prefix=("app",)).load(HumanProfile, THREAD, "alice") is None
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+import pytest
+from pydantic import ValidationError
+from conversation_states.store_schemas.schedule import CronExpression, CronScheduler, Schedule, ScheduleList
+from conversation_states.store_schemas.task import ActionItem
+
+DAY = datetime(2026, 1, 1)
+
+
+def schedule(expression, **kwargs):
+    return Schedule(frequency=CronExpression(type="cron", expression=expression),
+                    action=ActionItem(type="remind", instruction="ping"), **kwargs)
+
+
+def fires(tasks):
+    return [t.time.target for t in tasks]
+
+
+def test_fires_at_the_start_date_are_included():
+    daily = schedule("0 0 * * *")
+    schedules = ScheduleList(thread_id=uuid4(), schedules=[daily])
+    tasks = schedules.generate_tasks(DAY, horizon=timedelta(days=2))
+    assert fires(tasks) == [DAY, DAY + timedelta(days=1), DAY + timedelta(days=2)]
+    assert tasks[0].id == f"{daily.id}:{DAY.isoformat()}"
+
+
+def test_later_calls_continue_without_duplicates_or_backfill():
+    schedules = ScheduleList(thread_id=uuid4(), schedules=[schedule("0 * * * *")])
+    first = schedules.generate_tasks(DAY, horizon=timedelta(hours=2))
+    again = schedules.generate_tasks(DAY, horizon=timedelta(hours=2))
+    later = schedules.generate_tasks(DAY + timedelta(hours=2), horizon=timedelta(hours=2))
+    assert fires(first) == [DAY + timedelta(hours=h) for h in range(3)]
+    assert again == []
+    assert fires(later) == [DAY + timedelta(hours=h) for h in (3, 4)]
+    # Added late: starts where the schedules got to, not at the first call's date
+    schedules.add([schedule("30 * * * *")])
+    assert fires(schedules.generate_tasks(DAY + timedelta(hours=5), horizon=timedelta(0))) == \
+        [DAY + timedelta(hours=4, minutes=30), DAY + timedelta(hours=5)]
+
+
+def test_ends_at_and_removal_stop_a_schedule():
+    ending = schedule("0 0 * * *", ends_at=DAY + timedelta(days=1, hours=12))
+    removed = schedule("0 12 * * *")
+    schedules = ScheduleList(thread_id=uuid4(), schedules=[ending, removed])
+    schedules.remove_by_id([removed.id])
+    assert fires(schedules.generate_tasks(DAY, horizon=timedelta(days=5))) == [DAY, DAY + timedelta(days=1)]
+
+
+def test_scheduler_merges_schedules_in_time_order_and_skips_stale_entries():
+    hourly, half = schedule("0 * * * *"), schedule("30 * * * *")
+    scheduler = CronScheduler([hourly, half], start=DAY)
+    assert scheduler.next_fire() == DAY
+    scheduler.remove(half.id)
+    scheduler.add(half, start=DAY + timedelta(hours=1))
+    fired = scheduler.due(DAY + timedelta(hours=2))
+    assert [(at, s.id) for at, s in fired] == [
+        (DAY, hourly.id), (DAY + timedelta(hours=1), hourly.id),
+        (DAY + timedelta(hours=1, minutes=30), half.id), (DAY + timedelta(hours=2), hourly.id)]
+    assert len(scheduler) == 2
+
+
+def test_invalid_cron_is_rejected():
+    with pytest.raises(ValidationError):
+        CronExpression(type="cron", expression="every day")
@@ -0,0 +1,76 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from conversation_states.humans import Human
+from conversation_states.serialization import CheckpointReader, CheckpointWriter, dumps, loads
+from conversation_states.states import ExternalState, InternalState
+from conversation_states.tokens import TokenLedger
+
+
+def messages():
+    return [
+        HumanMessage(content="hi", id="h1", name="alice", example=False),
+        AIMessage(content="", id="a1", tool_calls=[{"name": "f", "args": {"n": 0}, "id": "c1"}]),
+        ToolMessage(content="done", tool_call_id="c1", id="t1", artifact=0, status="error"),
+        AIMessage(content=[{"type": "text", "text": "ok"}], id="a2", response_metadata={"model": "m"}),
+    ]
+
+
+def external():
+    return ExternalState(messages=messages(), users=[Human(username="alice", first_name="Alice",
+                                                           information={"city": "Paris"})], summary="s")
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_external_round_trip_is_lossless(compression):
+    state = external()
+    restored = loads(dumps(state, compression=compression))
+    assert type(restored) is ExternalState
+    assert restored.model_dump() == state.model_dump()
+    assert restored.messages == state.messages
+    assert restored.messages[2].artifact == 0 and restored.messages[0].example is False
+    assert restored.messages_api.total_tokens == TokenLedger.from_messages(state.messages).total
+    assert restored.users.get("alice").information == {"city": "Paris"}
+
+
+def test_internal_round_trip_is_lossless():
+    state = InternalState.from_external(external())
+    state.reasoning_messages.append(AIMessage(content="thinking", id="r1"))
+    restored = loads(dumps(state))
+    assert type(restored) is InternalState
+    assert restored.model_dump() == state.model_dump()
+
+
+def test_delta_checkpoints_replay_every_change():
+    writer, reader = CheckpointWriter(full_every=3), CheckpointReader()
+    state = external()
+    sizes = []
+
+    def check():
+        blob = writer.dump(state)
+        sizes.append(len(blob))
+        restored = reader.load(blob)
+        assert restored.model_dump() == state.model_dump()
+        assert restored.messages_api.total_tokens == TokenLedger.from_messages(state.messages).total
+
+    check()
+    state.messages.append(HumanMessage(content="more", id="h2", name="bob"))
+    state.users.upsert({"username": "bob", "first_name": "Bob"})
+    check()
+    state.users.get("alice").update_info({"city": "Lyon"})  # edited in place
+    state.summary = "longer summary"
+    check()
+    state.messages = state.messages[:1] + state.messages[2:] + [AIMessage(content="bye", id="a3")]
+    check()  # fourth dump: full again
+    state.messages.append(AIMessage(content="again", id="a4"))
+    check()
+    assert sizes[1] < sizes[0]
+
+
+def test_reader_rejects_a_delta_without_its_base():
+    writer = CheckpointWriter()
+    state = external()
+    writer.dump(state)
+    state.messages.append(AIMessage(content="x", id="x"))
+    delta = writer.dump(state)
+    with pytest.raises(ValueError):
+        CheckpointReader().load(delta)
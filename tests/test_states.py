@@ -0,0 +1,57 @@
+import pytest
+from pydantic import ValidationError
+from langchain_core.messages import AIMessage, HumanMessage
+from conversation_states.humans import Human
+from conversation_states.states import ExternalState, InternalState
+from conversation_states.tokens import TokenLedger
+
+
+def make_external():
+    return ExternalState(
+        messages=[HumanMessage(content="hi", id="h1", name="alice"),
+                  AIMessage(content="hello alice", id="a1"),
+                  HumanMessage(content="how are you?", id="h2", name="alice")],
+        users=[Human(username="alice", first_name="Alice")],
+        summary="earlier",
+    )
+
+
+def test_from_external_matches_full_validation():
+    external = make_external()
+    internal = InternalState.from_external(external)
+    validated = InternalState(
+        reasoning_messages=[], summary="earlier", users=list(external.users),
+        external_messages=list(external.messages), last_external_message=external.messages[-1],
+        last_sender=external.users[0])
+    assert internal.model_dump() == validated.model_dump()
+    assert internal.token_ledger("external_messages").total == \
+        TokenLedger.from_messages(external.messages).total
+
+
+def test_from_external_without_a_known_sender_still_fails_validation():
+    external = ExternalState(messages=[HumanMessage(content="hi", id="h1", name="ghost")])
+    with pytest.raises(ValidationError):
+        InternalState.from_external(external)
+
+
+def test_conversions_do_not_share_mutable_state():
+    external = make_external()
+    internal = InternalState.from_external(external)
+    internal.external_messages.append(AIMessage(content="draft", id="d1"))
+    internal.external_messages[0] = HumanMessage(content="edited", id="h1", name="alice")
+    internal.users.upsert(Human(username="bob", first_name="Bob"))
+
+    assert [m.content for m in external.messages] == ["hi", "hello alice", "how are you?"]
+    assert "bob" not in external.users
+    assert external.messages_api.total_tokens == TokenLedger.from_messages(external.messages).total
+    assert internal.token_ledger("external_messages").total == \
+        TokenLedger.from_messages(internal.external_messages).total
+
+    internal.reasoning_messages.append(AIMessage(content="thinking", id="r1"))
+    back = ExternalState.from_internal(internal, AIMessage(content="fine, thanks", id="a2"))
+    back.last_reasoning.append(AIMessage(content="more", id="r2"))
+    back.users.upsert(Human(username="carol", first_name="Carol"))
+    assert [m.id for m in internal.reasoning_messages] == ["r1"]
+    assert "carol" not in internal.users
+    assert [m.id for m in back.messages] == ["a2"]
+    assert back.token_ledger("last_reasoning").total == TokenLedger.from_messages(back.last_reasoning).total
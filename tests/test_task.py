@@ -0,0 +1,71 @@
+import random
+from datetime import datetime, timedelta
+from conversation_states.store_schemas.task import ActionItem, ApproximateDateTime, Task, TaskList
+
+BASE = datetime(2026, 1, 1)
+
+
+def task(hours, before=0, after=0, task_id=None):
+    extra = {"id": task_id} if task_id else {}
+    return Task(time=ApproximateDateTime(target=BASE + timedelta(hours=hours), hr_before=before, hr_after=after),
+                requested_by=None, reply_to=None, action=ActionItem(type="remind", instruction="ping"), **extra)
+
+
+def brute_force(tasks, from_date, to_date):
+    return {t.id for t in tasks if t.time.get_range()[0] <= to_date and t.time.get_range()[1] >= from_date}
+
+
+def at(hours):
+    return BASE + timedelta(hours=hours)
+
+
+def test_window_queries_match_a_linear_scan():
+    rng = random.Random(7)
+    tasks = [task(rng.randint(0, 500), rng.randint(0, 200), rng.randint(0, 48)) for _ in range(300)]
+    tl = TaskList(thread_id="t", tasks=tasks[:150])
+    tl.add(tasks[150:])
+    tl.remove_by_id([t.id for t in tasks[::3]])
+    live = [t for i, t in enumerate(tasks) if i % 3]
+    for _ in range(200):
+        lo = rng.randint(-50, 600)
+        hi = lo + rng.randint(0, 30)
+        found = tl.get_by_date(at(lo), at(hi))
+        assert {t.id for t in found} == brute_force(live, at(lo), at(hi))
+        assert [t.time.get_range()[0] for t in found] == sorted(t.time.get_range()[0] for t in found)
+
+
+def test_add_skips_known_ids_and_remove_reports_misses():
+    first = task(5)
+    tl = TaskList(thread_id="t", tasks=[first])
+    assert not tl.add([task(9, task_id=first.id)])
+    assert tl.add([task(9)])
+    assert len(tl.tasks) == 2 and tl.get(first.id) is first
+    assert not tl.remove_by_id(["missing"])
+    assert tl.remove_by_id([first.id]) and tl.due_at(at(5)) == []
+
+
+def test_index_follows_in_place_list_edits():
+    old, other = task(5), task(10)
+    tl = TaskList(thread_id="t", tasks=[old, task(20)])
+    assert tl.due_at(at(5)) == [old]
+    tl.tasks[0] = other
+    assert tl.due_at(at(5)) == [] and tl.due_at(at(10)) == [other]
+    assert tl.remove_by_id([other.id]) and tl.tasks[0].time.target == at(20)
+    tl.tasks.append(task(30))
+    assert len(tl.due_at(at(30))) == 1
+    tl.tasks.clear()
+    assert tl.get_by_date(at(0), at(100)) == []
+    tl.tasks = [old]
+    assert tl.get(old.id) is old
+    tl.tasks.pop()
+    assert tl.get(old.id) is None
+
+
+def test_duplicate_ids_are_kept_once():
+    first, twin = task(5, task_id="same"), task(50, task_id="same")
+    tl = TaskList.model_validate({"thread_id": "t", "tasks": [first.model_dump(), twin.model_dump()]})
+    assert len(tl.tasks) == 1 and tl.tasks[0].time.target == at(5)
+    tl.tasks.append(twin)
+    assert [t.id for t in tl.get_by_date(at(0), at(100))] == ["same"]
+    assert tl.remove_by_id(["same"]) and tl.tasks == []
+    assert tl.get_by_date(at(0), at(100)) == []
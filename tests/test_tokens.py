@@ -0,0 +1,67 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from conversation_states.states import ExternalState, InternalState
+from conversation_states.tokens import MessageList, TokenLedger, count_many, get_counter
+from conversation_states.utils.reducers import add_counted_messages
+
+
+def test_count_many_matches_single_counts():
+    messages = [HumanMessage(content="hello world"), AIMessage(content=""),
+                HumanMessage(content="hello world"), ToolMessage(content="42", tool_call_id="c")]
+    assert count_many(messages) == [get_counter().count(m) for m in messages]
+    assert count_many(messages)[1] == 0
+
+
+def test_ledger_mirrors_add_messages():
+    ledger = TokenLedger.from_messages([HumanMessage(content="one two", id="a"), AIMessage(content="three")])
+    ledger.apply([HumanMessage(content="a much longer replacement text", id="a"),
+                  AIMessage(content="four", id="b"), RemoveMessage(id="missing")])
+    expected = TokenLedger.from_messages([HumanMessage(content="a much longer replacement text", id="a"),
+                                          AIMessage(content="three"), AIMessage(content="four", id="b")])
+    assert (ledger.total, ledger.counts, ledger.unkeyed) == (expected.total, expected.counts, expected.unkeyed)
+    ledger.apply([RemoveMessage(id="a")])
+    assert ledger.total == expected.total - expected.counts["a"]
+    ledger.apply([RemoveMessage(id=REMOVE_ALL_MESSAGES)])
+    assert ledger.total == 0 and not ledger.counts
+
+
+def test_reducer_result_carries_a_current_ledger():
+    left = add_counted_messages([], [HumanMessage(content="hi there", id="h1")])
+    merged = add_counted_messages(left, [AIMessage(content="hello", id="a1")])
+    assert isinstance(merged, MessageList)
+    assert merged.current_ledger().total == TokenLedger.from_messages(merged).total
+    merged.append(HumanMessage(content="appended by hand", id="h2"))
+    assert merged.current_ledger() is None
+
+
+def test_ledger_follows_graph_updates(run_graph):
+    seen = run_graph(
+        ExternalState,
+        lambda s: {"messages": [AIMessage(content="hi alice", id="a1")]},
+        lambda s: {"messages": [AIMessage(content="a much longer greeting for alice", id="a1"),
+                                HumanMessage(content="thanks", id="h2")]},
+        lambda s: {"messages": [RemoveMessage(id="h1")]},
+        lambda s: None,
+        messages=[HumanMessage(content="hello there", id="h1", name="alice")],
+    )
+    for state in seen:
+        fresh = TokenLedger.from_messages(state.messages)
+        assert state.messages_api.total_tokens == fresh.total
+        assert state.token_ledger("messages").counts == fresh.counts
+    assert [m.id for m in seen[-1].messages] == ["a1", "h2"]
+
+
+def test_internal_state_ledgers_follow_graph_updates(run_graph):
+    seen = run_graph(
+        InternalState,
+        lambda s: {"reasoning_messages": [AIMessage(content="thinking", id="r1")]},
+        lambda s: {"reasoning_messages": [AIMessage(content="thinking harder now", id="r1")]},
+        lambda s: None,
+        external_messages=[HumanMessage(content="question", id="h1", name="alice")],
+        last_external_message=HumanMessage(content="question", id="h1", name="alice"),
+        users=[{"username": "alice", "first_name": "Alice"}],
+        last_sender={"username": "alice", "first_name": "Alice"},
+    )
+    for state in seen:
+        for field in ("reasoning_messages", "external_messages"):
+            assert state.token_ledger(field).total == TokenLedger.from_messages(getattr(state, field)).total
@@ -0,0 +1,58 @@
+from typing import List, Optional
+from pydantic import BaseModel
+from conversation_states.store_schemas.utils.tracker import Tracked
+
+
+class Inner(BaseModel):
+    a: int = 0
+    b: int = 0
+
+
+class Outer(BaseModel):
+    x: Inner = Inner()
+    y: Optional[Inner] = None
+    items: List[Inner] = []
+
+
+def tracked(obj):
+    calls = []
+    return Tracked(obj, lambda old, new, changes: calls.append((old, new, changes))), calls
+
+
+def test_update_copies_only_the_touched_path():
+    original = Outer(x=Inner(), y=Inner(), items=[Inner(a=1)])
+    t, calls = tracked(original)
+    t.update(x__a=5)
+    [(old, new, changes)] = calls
+    assert old is original and original.x.a == 0
+    assert new.x.a == 5 and new.y is original.y and new.items is original.items
+    assert changes == {"x.a": 5}
+    t.update(x__a=5)
+    assert len(calls) == 1  # no change, no callback
+
+
+def test_batch_emits_once_and_copies_each_node_once():
+    original = Outer(items=[Inner(), Inner()])
+    t, calls = tracked(original)
+    with t.batch():
+        t.update(items__0__a=1)
+        t.update(items__1__b=2)
+        t.update(x__a=3)
+    [(old, new, changes)] = calls
+    assert old is original and original.items[0].a == 0
+    assert [(i.a, i.b) for i in new.items] == [(1, 0), (0, 2)]
+    assert changes == {"items.0.a": 1, "items.1.b": 2, "x.a": 3}
+    assert t.get() is new
+
+
+def test_values_passed_in_are_never_edited_in_place():
+    for _ in range(200):
+        t, calls = tracked(Outer())
+        with t.batch():
+            t.update(x__a=1)
+            t.update(x=Inner())  # frees the copy made for x__a
+            mine = Inner()
+            t.update(y=mine)
+            t.update(y__b=7)
+        assert mine.b == 0
+        assert t.get().y.b == 7
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+import pytest
+from pydantic import BaseModel
+from conversation_states.store_schemas.utils.version_management import VersionedObject
+
+T0 = datetime(2026, 1, 1)
+
+
+class Note(BaseModel):
+    text: str
+    tags: list[str] = []
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def history(count, snapshot_every=3):
+    obj = VersionedObject[Note](object_id="n", current=Note(text="v0"), snapshot_every=snapshot_every)
+    for i in range(count):
+        obj.add_version(Note(text=f"v{i}", tags=[str(i)] if i % 2 else []), timestamp=at(i))
+    return obj
+
+
+def test_get_at_returns_the_version_active_at_a_time():
+    obj = history(8)
+    assert obj.get_at(at(-1)) is None
+    for i in range(8):
+        assert obj.get_at(at(i)) == Note(text=f"v{i}", tags=[str(i)] if i % 2 else [])
+        assert obj.get_at(at(i) + timedelta(seconds=30)).text == f"v{i}"
+    assert [v.data is not None for v in obj.versions] == [True, False, False, True, False, False, True, False]
+    assert obj.compare_versions(0, 1) == {"text": {"old": "v0", "new": "v1"}, "tags": {"old": [], "new": ["1"]}}
+
+
+def test_history_is_independent_of_the_live_object():
+    obj = history(1)
+    note = Note(text="draft", tags=["a"])
+    obj.add_version(note, timestamp=at(1))
+    note.tags.append("b")
+    obj.current.text = "edited in place"
+    obj.add_version(obj.current, timestamp=at(2))
+    assert obj.get_at(at(1)) == Note(text="draft", tags=["a"])
+    assert obj.versions[-1].delta == {"text": "edited in place", "tags": ["a", "b"]}
+    restored = obj.get_at(at(2))
+    restored.tags.append("c")
+    assert obj.get_at(at(2)).tags == ["a", "b"]
+
+
+def test_timestamps_cannot_go_back():
+    obj = history(3)
+    with pytest.raises(ValueError):
+        obj.add_version(Note(text="late"), timestamp=at(1))
+    assert len(obj.versions) == 3
+    obj.add_version(Note(text="same minute"), timestamp=at(2))
+    assert obj.get_at(at(2)).text == "same minute"
+    obj.add_version(Note(text="now"))
+    assert obj.versions[-1].timestamp >= at(2)
+
+
+def test_compaction_keeps_point_in_time_lookups():
+    obj = history(10)
+    obj.max_versions = 4
+    obj.add_version(Note(text="v10"), timestamp=at(10))
+    assert len(obj.versions) == 4 and obj.versions[0].data is not None
+    assert obj.get_at(at(5)) is None
+    assert [obj.get_at(at(i)).text for i in range(7, 11)] == ["v7", "v8", "v9", "v10"]
+    assert obj.compact(before=at(9)) == 2
+    assert obj.get_at(at(9)).text == "v9" and obj.get_latest().text == "v10"